@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import json
+import argparse
+import hashlib
+import multiprocessing
+import numpy as np
+from PIL import Image
+from rawcache import decode_image, read_raw, write_raw
+from etc1 import encode, decode, write_pkm, psnr
+
+# Texture art resampled per display profile: the art is 512x512 (or
+# more) whatever size the eye is drawn at, so a profile that draws the
+# eye at half size (128/240 pixel SPI screens behind fbx2) gets variants
+# at half the resolution, in the leanest pixel format that keeps them
+# exact (no all-opaque alpha, one channel for grey art).  Variants are
+# raw files (see rawcache.py), memory-mapped at load time, or with
+# format 'etc1' ETC1 compressed .pkm files (see etc1.py) for the art
+# without alpha.  ETC1 has one hue per half block, so art with fine
+# detail in contrasting colors (the circuit scleras) can come out badly;
+# variants under etc1_min_db PSNR stay raw.
+#
+# Layout: <asset_dir>/<profile>/<sha1 of source path>.raw|.pkm plus
+# manifest.json mapping each source path to its variant and the source
+# size/mtime it was built from; only sources that changed are rebuilt.
+ASSET_VERSION = 2
+# pi3d.Texture golden widths; pi3d resizes anything else on the Pi
+GOLDEN_WIDTHS = [4, 8, 16, 32, 48, 64, 72, 96, 128, 144, 192, 256,
+                 288, 384, 512, 576, 640, 720, 768, 800, 960, 1024, 1080, 1920]
+
+def stamp(fname):
+    st = os.stat(fname)
+    return [st.st_size, int(st.st_mtime)]
+
+# Smallest golden width covering the scaled art, never above the source
+def variant_size(size,scale):
+    (width, height) = size
+    target = width * scale
+    fits = [w for w in GOLDEN_WIDTHS if w >= target and w <= width]
+    if len(fits) == 0:
+        return (width, height)
+    return (fits[0], max(1, int(round(height * fits[0] / float(width)))))
+
+def reduce_format(a):
+    if a.shape[2] == 4 and (a[:,:,3] == 255).all():
+        a = a[:,:,0:3]
+    if a.shape[2] == 3 and (a[:,:,0] == a[:,:,1]).all() and (a[:,:,1] == a[:,:,2]).all():
+        a = a[:,:,0:1]
+    return a
+
+# Worker: one variant (module level so multiprocessing can pickle it)
+def build_variant(task):
+    (fname, fname_out, scale, asset_format, etc1_min_db) = task
+    size = variant_size(Image.open(fname).size, scale)
+    a = reduce_format(decode_image(fname, size))
+    db = None
+    if asset_format == 'etc1' and a.shape[2] in [1, 3]:
+        rgb = np.repeat(a, 3, axis=2) if a.shape[2] == 1 else a
+        words = encode(rgb)
+        db = psnr(rgb, decode(words, rgb.shape[0], rgb.shape[1]))
+    if db is not None and db >= etc1_min_db:
+        fname_out += '.pkm'
+        write_pkm(fname_out, rgb, words)
+        nbytes = words.nbytes
+        format = 'etc1'
+    else:
+        fname_out += '.raw'
+        write_raw(fname_out, a)
+        nbytes = a.nbytes
+        format = 'raw'
+    return (fname, {'file': os.path.basename(fname_out),
+                    'stamp': stamp(fname),
+                    'scale': scale,
+                    'asset_format': asset_format,
+                    'format': format,
+                    'shape': list(a.shape),
+                    'bytes': nbytes,
+                    'etc1_db': db})
+
+def manifest_path(asset_dir,profile):
+    return os.path.join(asset_dir,profile,'manifest.json')
+
+def load_manifest(asset_dir,profile):
+    fname = manifest_path(asset_dir,profile)
+    if not os.path.exists(fname):
+        return {}
+    try:
+        with open(fname) as f:
+            manifest = json.load(f)
+        if manifest['version'] != ASSET_VERSION:
+            raise ValueError('version {}'.format(manifest['version']))
+        return manifest['assets']
+    except (ValueError, KeyError, IOError) as e:
+        print ('assets: ignoring {}: {}'.format(fname,e))
+        return {}
+
+class asset_pipeline_t(object):
+    def __init__(self,asset_dir='cache/assets',jobs=None,debug=False):
+        self.debug = debug
+        self.asset_dir = asset_dir
+        self.jobs = jobs # None: one worker per CPU
+
+    # asset_format: 'raw' or 'etc1' (art with alpha, or under etc1_min_db
+    # PSNR as ETC1, stays raw)
+    def build(self,profile,scale,fnames,asset_format='raw',etc1_min_db=30.0):
+        dir = os.path.join(self.asset_dir,profile)
+        old = load_manifest(self.asset_dir,profile)
+        assets = {}
+        tasks = []
+        for fname in sorted(set(fnames)):
+            if not os.path.exists(fname):
+                print ('assets: missing {}'.format(fname))
+                continue
+            fname_out = os.path.join(dir,hashlib.sha1(fname.encode('utf-8')).hexdigest())
+            entry = old.get(fname)
+            if entry is not None and entry['stamp'] == stamp(fname) and \
+               entry['scale'] == scale and \
+               entry.get('asset_format') == asset_format and \
+               (asset_format != 'etc1' or entry.get('etc1_min_db') == etc1_min_db) and \
+               os.path.exists(os.path.join(dir,entry['file'])):
+                assets[fname] = entry
+            else:
+                tasks.append((fname, fname_out, scale, asset_format, etc1_min_db))
+
+        if len(tasks) > 0:
+            if not os.path.isdir(dir):
+                os.makedirs(dir)
+            if self.jobs == 1:
+                results = [build_variant(task) for task in tasks]
+            else:
+                pool = multiprocessing.Pool(self.jobs)
+                try:
+                    results = pool.map(build_variant, tasks)
+                finally:
+                    pool.close()
+                    pool.join()
+            for (fname, entry) in results:
+                entry['etc1_min_db'] = etc1_min_db
+                if self.debug:
+                    print ('assets: {} -> {}'.format(fname, entry['shape']))
+                assets[fname] = entry
+
+        fname_manifest = manifest_path(self.asset_dir,profile)
+        if not os.path.isdir(dir):
+            os.makedirs(dir)
+        tmp = '{}.{}.tmp'.format(fname_manifest, os.getpid())
+        with open(tmp,'w') as f:
+            json.dump({'version': ASSET_VERSION,
+                       'profile': profile,
+                       'assets': assets}, f, indent=1, sort_keys=True)
+        os.rename(tmp, fname_manifest)
+
+        nbytes = sum(e['bytes'] for e in assets.values())
+        print ('assets: {}: {} built, {} up to date, {:.1f} MB of textures'.format(
+            profile, len(tasks), len(assets) - len(tasks), nbytes / float(1 << 20)))
+        return assets
+
+# Runtime side: resolves art to the variant built for the profile, as
+# long as the source has not changed since
+class asset_manifest_t(object):
+    def __init__(self,asset_dir='cache/assets',profile='hdmi',debug=False):
+        self.debug = debug
+        self.dir = os.path.join(asset_dir,profile)
+        self.assets = load_manifest(asset_dir,profile)
+
+    def entry(self,fname,format):
+        entry = self.assets.get(fname)
+        if entry is None or entry.get('format') != format or \
+           not os.path.exists(fname) or entry['stamp'] != stamp(fname):
+            return None
+        return entry
+
+    # Variant pixels (read-only memory map), None if there is none
+    def load(self,fname):
+        entry = self.entry(fname,'raw')
+        if entry is None:
+            return None
+        a = read_raw(os.path.join(self.dir,entry['file']))
+        if a is not None and self.debug:
+            print ('assets: {} from {}'.format(fname,entry['file']))
+        return a
+
+    # ETC1 variant file, None if there is none
+    def compressed(self,fname):
+        entry = self.entry(fname,'etc1')
+        if entry is None:
+            return None
+        return os.path.join(self.dir,entry['file'])
+
+# Builds the variants for one display profile, ahead of running the eye
+# with that --display_profile.  Kept out of gecko.py, which opens the
+# pi3d display and compiles shaders as it is imported: the art lists come
+# from eyecfg.py, and the worker processes fork without a GL context.
+if __name__ == '__main__':
+    from eyecfg import DISPLAY_PROFILES, HACK_SCLERAS, HACK_IRIS, \
+        load_eye_constraints, asset_list
+    parser = argparse.ArgumentParser(description='Build art variants for a display profile')
+    parser.add_argument('--display_profile', default='hdmi',
+                        choices=sorted(DISPLAY_PROFILES),
+                        help='Output display to build for')
+    parser.add_argument('--asset_dir', default='cache/assets',
+                        help='Where the variants go (gecko.py --asset_dir)')
+    parser.add_argument('--asset_format', default='raw', choices=['raw', 'etc1'],
+                        help='Built art variants: raw pixels or ETC1 compressed')
+    parser.add_argument('--etc1_min_db', default=30.0, type=float,
+                        help='etc1 variants under this PSNR stay raw')
+    parser.add_argument('--jobs', default=None, type=int,
+                        help='Build processes (default: one per CPU)')
+    parser.add_argument('--eye_constraints', default=None,
+                        help='Hack eye lists from this xlsx (gecko.py --eye_constraints)')
+    parser.add_argument('--debug', action='store_true',
+                        help='Print each variant built')
+    args = parser.parse_args()
+
+    (hack_scleras, hack_iris) = (HACK_SCLERAS, HACK_IRIS)
+    if args.eye_constraints is not None:
+        (constraints, hack_scleras, hack_iris) = load_eye_constraints(args.eye_constraints)
+    asset_pipeline_t(asset_dir=args.asset_dir,
+                     jobs=args.jobs,
+                     debug=args.debug).build(args.display_profile,
+                                             DISPLAY_PROFILES[args.display_profile],
+                                             asset_list(hack_scleras=hack_scleras,
+                                                        hack_iris=hack_iris),
+                                             args.asset_format,
+                                             args.etc1_min_db)
+    sys.exit(0)
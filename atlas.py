@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import json
+import hashlib
+import argparse
+import numpy as np
+from PIL import Image
+
+# Texture atlas for frame sequences (sclera animations): the frames of a
+# directory are packed into a few large pages, each frame with its own
+# UV rectangle, so an animation is played by moving the texture offset
+# (pi3d unib[2] umult/vmult and unib[3] offset) instead of binding a new
+# texture every frame.
+#
+# Packing runs offline (python atlas.py <dir>) or on first use and is
+# cached: cache/atlas/<key>/page_<n>.png plus atlas.json, keyed by the
+# frame files (name, size, mtime) and the packing parameters.
+#
+# Frames are wrapped horizontally by 'roll' (texture U offset of the
+# lathe, which cannot wrap inside a sub-rectangle) and get a gutter of
+# repeated pixels - wrapped left/right for the lathe seam, edge top/bottom
+# - so linear filtering never reads a neighbouring frame.
+ATLAS_VERSION = 1
+ATLAS_PAGE_PX = 1024 # Width is a pi3d golden width, so never resized
+ATLAS_GUTTER = 2
+ATLAS_EXTS = ('.jpg', '.jpeg', '.png')
+
+class atlas_cache_t(object):
+    def __init__(self,cache_dir='cache/atlas',page_px=ATLAS_PAGE_PX,
+                 gutter=ATLAS_GUTTER,debug=False):
+        self.debug = debug
+        self.cache_dir = cache_dir
+        self.page_px = page_px
+        self.gutter = gutter
+
+    def frames(self,src_dir):
+        return [os.path.join(src_dir,f) for f in sorted(os.listdir(src_dir))
+                if os.path.splitext(f)[1].lower() in ATLAS_EXTS]
+
+    def key(self,fnames,frame_px,roll):
+        h = hashlib.sha1()
+        for fname in fnames:
+            st = os.stat(fname)
+            h.update(repr((os.path.basename(fname), st.st_size,
+                           int(st.st_mtime))).encode('utf-8'))
+        h.update(repr((ATLAS_VERSION, frame_px, roll,
+                       self.page_px, self.gutter)).encode('utf-8'))
+        return h.hexdigest()
+
+    # Returns the atlas description:
+    #   'pages': page image file names
+    #   'rects': per frame (page, u, v, umult, vmult)
+    #   'frame_bytes', 'atlas_bytes': texture memory as one texture per
+    #   source frame and as atlas pages
+    # frame_px: frame size in the atlas (None: as the source files)
+    def get(self,src_dir,frame_px=None,roll=0.0):
+        fnames = self.frames(src_dir)
+        if len(fnames) == 0:
+            raise ValueError('no frames in {}'.format(src_dir))
+        key = self.key(fnames,frame_px,roll)
+        dir = os.path.join(self.cache_dir,key)
+        fname_json = os.path.join(dir,'atlas.json')
+        atlas = None
+        if os.path.exists(fname_json):
+            try:
+                with open(fname_json) as f:
+                    atlas = json.load(f)
+                atlas['pages'] = [os.path.join(dir,p) for p in atlas['pages']]
+                if not all(os.path.exists(p) for p in atlas['pages']):
+                    raise ValueError('missing page')
+            except (ValueError, KeyError, IOError) as e:
+                print ('atlas: ignoring {}: {}'.format(fname_json,e))
+                atlas = None
+            if atlas is not None and self.debug:
+                print ('atlas: loaded {}'.format(fname_json))
+        if atlas is None:
+            atlas = self.build(fnames,dir,frame_px,roll)
+        self.report(src_dir,atlas)
+        return atlas
+
+    def build(self,fnames,dir,frame_px,roll):
+        g = self.gutter
+        frames = []
+        frame_bytes = 0
+        for fname in fnames:
+            im = Image.open(fname)
+            if im.mode not in ('RGB', 'RGBA'):
+                im = im.convert('RGB')
+            # As one texture per source frame
+            frame_bytes += im.size[0] * im.size[1] * len(im.getbands())
+            if frame_px is not None and im.size != (frame_px, frame_px):
+                im = im.resize((frame_px, frame_px), Image.BICUBIC)
+            a = np.asarray(im)
+            a = np.roll(a, -int(round(roll * a.shape[1])), axis=1)
+            a = np.pad(a, ((0,0),(g,g),(0,0)), mode='wrap')
+            a = np.pad(a, ((g,g),(0,0),(0,0)), mode='edge')
+            frames.append(a)
+
+        channels = max(a.shape[2] for a in frames)
+        (ch, cw) = frames[0].shape[0:2]
+        if any(a.shape[0:2] != (ch, cw) for a in frames):
+            raise ValueError('frames differ in size')
+        cols = self.page_px // cw
+        rows = self.page_px // ch
+        if cols == 0 or rows == 0:
+            raise ValueError('{}px frames do not fit {}px pages'.format(
+                cw - 2*g, self.page_px))
+
+        if not os.path.isdir(dir):
+            os.makedirs(dir)
+        pages = []
+        rects = []
+        per_page = cols * rows
+        atlas_bytes = 0
+        for first in range(0, len(frames), per_page):
+            chunk = frames[first:first+per_page]
+            # Last page only as tall as the rows it uses
+            height = ((len(chunk) + cols - 1) // cols) * ch
+            page = np.zeros((height, self.page_px, channels), dtype=np.uint8)
+            if channels == 4:
+                page[:,:,3] = 255
+            for (i, a) in enumerate(chunk):
+                (y, x) = ((i // cols) * ch, (i % cols) * cw)
+                page[y:y+ch, x:x+cw, 0:a.shape[2]] = a
+                rects.append((len(pages),
+                              float(x + g) / self.page_px,
+                              float(y + g) / height,
+                              float(cw - 2*g) / self.page_px,
+                              float(ch - 2*g) / height))
+            name = 'page_{}.png'.format(len(pages))
+            Image.fromarray(page).save(os.path.join(dir,name))
+            pages.append(name)
+            atlas_bytes += page.nbytes
+
+        atlas = {'pages': pages,
+                 'rects': rects,
+                 'frame_bytes': frame_bytes,
+                 'atlas_bytes': atlas_bytes}
+        tmp = os.path.join(dir,'atlas.json.{}.tmp'.format(os.getpid()))
+        with open(tmp,'w') as f:
+            json.dump(atlas,f)
+        os.rename(tmp,os.path.join(dir,'atlas.json'))
+        if self.debug:
+            print ('atlas: built {}'.format(dir))
+        atlas['pages'] = [os.path.join(dir,p) for p in pages]
+        return atlas
+
+    def report(self,src_dir,atlas):
+        print ('atlas: {}: {} frames in {} pages, {:.1f} MB (was {:.1f} MB as frames)'.format(
+            src_dir, len(atlas['rects']), len(atlas['pages']),
+            atlas['atlas_bytes'] / float(1 << 20),
+            atlas['frame_bytes'] / float(1 << 20)))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Pack frame sequences into texture atlases')
+    parser.add_argument('dirs', nargs='+',
+                        help='Directories of frames')
+    parser.add_argument('--cache_dir', default='cache/atlas',
+                        help='Atlas cache directory')
+    parser.add_argument('--frame_px', default=None, type=int,
+                        help='Frame size in the atlas (default: as the source)')
+    parser.add_argument('--roll', default=0.0, type=float,
+                        help='Texture U offset of the lathe (0.5 for a left eye)')
+    parser.add_argument('--page_px', default=ATLAS_PAGE_PX, type=int,
+                        help='Atlas page width and maximum height')
+    args = parser.parse_args()
+
+    cache = atlas_cache_t(cache_dir=args.cache_dir, page_px=args.page_px,
+                          debug=True)
+    for src_dir in args.dirs:
+        try:
+            cache.get(src_dir, frame_px=args.frame_px, roll=args.roll)
+        except (ValueError, IOError, OSError) as e:
+            print ('atlas: {}: {}'.format(src_dir,e))
+            sys.exit(1)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+
+import time
+import ctypes
+import ctypes.util
+
+# Monotonic seconds for eye timing.  Unlike time.time() it never steps
+# when the wall clock is set (the Pi has no RTC, so NTP sets it some time
+# after boot, mid-animation).  Python 2 has no time.monotonic, so there it
+# is clock_gettime(CLOCK_MONOTONIC) through ctypes.
+CLOCK_MONOTONIC = 1
+
+class timespec_t(ctypes.Structure):
+    _fields_ = [('tv_sec', ctypes.c_long),
+                ('tv_nsec', ctypes.c_long)]
+
+def librt_monotonic():
+    librt = ctypes.CDLL(ctypes.util.find_library('rt') or 'librt.so.1',
+                        use_errno=True)
+    clock_gettime = librt.clock_gettime
+    clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(timespec_t)]
+    ts = timespec_t()
+
+    def monotonic():
+        if clock_gettime(CLOCK_MONOTONIC, ctypes.byref(ts)) != 0:
+            raise OSError(ctypes.get_errno(), 'clock_gettime')
+        return ts.tv_sec + ts.tv_nsec * 1e-9
+    monotonic()
+    return monotonic
+
+if hasattr(time, 'monotonic'):
+    monotonic = time.monotonic
+else:
+    try:
+        monotonic = librt_monotonic()
+    except (OSError, AttributeError):
+        monotonic = time.time
+
+# Fixed timestep: the eye state advances in steps of exactly 1/rate_hz
+# seconds whatever the frame rate, and each frame draws the state
+# alpha() of the way from the step before the latest to the latest.
+# If rendering stalls for more than max_steps steps the simulation skips
+# ahead instead of trying to catch up.
+class fixed_step_t(object):
+    def __init__(self,rate_hz=60.0,max_steps=8):
+        self.dt = 1.0 / rate_hz
+        self.max_steps = max_steps
+        self.sim_sec = None # Time of the latest step
+        self.steps = 0
+        self.skipped = 0
+
+    # Times of the steps due by now_sec, oldest first
+    def advance(self,now_sec):
+        if self.sim_sec is None:
+            self.sim_sec = now_sec
+            self.steps += 1
+            return [now_sec]
+        n = int((now_sec - self.sim_sec) / self.dt)
+        if n > self.max_steps:
+            self.skipped += n - self.max_steps
+            self.sim_sec += (n - self.max_steps) * self.dt
+            n = self.max_steps
+        times = [self.sim_sec + (i + 1) * self.dt for i in range(n)]
+        if n > 0:
+            self.sim_sec = times[-1]
+        self.steps += n
+        return times
+
+    def alpha(self,now_sec):
+        if self.sim_sec is None:
+            return 1.0
+        return min(max((now_sec - self.sim_sec) / self.dt, 0.0), 1.0)
+
+# Frame limiter: wait() returns once the next frame is due, at most fps
+# times a second, sleeping for all but the last spin_sec of the wait and
+# spinning on the clock for the rest (sleep() can wake a scheduler tick
+# late).  A frame that runs late starts the next one at once; after a
+# long stall the schedule restarts rather than rendering a burst.
+# fps None or 0: no limit, wait() only samples the clock.
+class frame_pacer_t(object):
+    def __init__(self,fps=None,spin_sec=0.001):
+        self.period = 1.0 / fps if fps else None
+        self.spin_sec = spin_sec
+        self.next_sec = None
+        self.start_sec = None
+        self.wake_sec = None
+        self.frames = 0
+        self.late = 0
+        self.busy_sec = 0.0
+        self.sleep_sec = 0.0
+
+    # Returns the time the frame starts
+    def wait(self):
+        now_sec = monotonic()
+        if self.wake_sec is not None:
+            self.busy_sec += now_sec - self.wake_sec
+        else:
+            self.start_sec = now_sec
+        self.frames += 1
+
+        if self.period is not None:
+            if self.next_sec is None:
+                self.next_sec = now_sec
+            remaining = self.next_sec - now_sec
+            if remaining > 0.0:
+                if remaining > self.spin_sec:
+                    time.sleep(remaining - self.spin_sec)
+                while monotonic() < self.next_sec:
+                    pass
+            elif remaining < -self.period:
+                self.late += 1
+                self.next_sec = now_sec
+            elif self.frames > 1:
+                self.late += 1
+            self.next_sec += self.period
+            woke_sec = monotonic()
+            self.sleep_sec += woke_sec - now_sec
+            now_sec = woke_sec
+
+        self.wake_sec = now_sec
+        return now_sec
+
+    def stats(self):
+        if self.start_sec is None or self.wake_sec <= self.start_sec:
+            return 'no frames'
+        elapsed = self.wake_sec - self.start_sec
+        return '{} frames, {:.1f} fps (target {}), {:.0f}% busy, {} late'.format(
+            self.frames, (self.frames - 1) / elapsed,
+            'none' if self.period is None else '{:.1f}'.format(1.0 / self.period),
+            100.0 * self.busy_sec / elapsed, self.late)
@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import struct
+import argparse
+import numpy as np
+
+# ETC1 texture compression (GL_OES_compressed_ETC1_RGB8_texture, which the
+# Pi's VideoCore IV supports): 4x4 pixel blocks of 64 bits, i.e. 4 bits a
+# pixel against 24 for RGB.  Each block is two 2x4 or 4x2 halves ('flip'),
+# each a base color plus one of eight intensity modifier tables, and a
+# 2 bit modifier index per pixel.  Base colors are either RGB555 plus a
+# 3 bit signed delta for the second half ('differential') or two RGB444.
+#
+# The encoder tries both flips with the half averages as base colors and
+# picks the best table and modifiers per half by squared error.  Files
+# are PKM (the Khronos/Android etc1tool container): a 16 byte header then
+# the blocks, row by row, each 8 bytes big endian.
+ETC1_MODIFIERS = np.array([[  2,   8,   -2,   -8],
+                           [  5,  17,   -5,  -17],
+                           [  9,  29,   -9,  -29],
+                           [ 13,  42,  -13,  -42],
+                           [ 18,  60,  -18,  -60],
+                           [ 24,  80,  -24,  -80],
+                           [ 33, 106,  -33, -106],
+                           [ 47, 183,  -47, -183]], dtype=np.int32)
+
+PKM_MAGIC = b'PKM '
+PKM_VERSION = b'10'
+PKM_ETC1_RGB_NO_MIPMAPS = 0
+PKM_HEADER = struct.Struct('>4s2sHHHHH') # 16 bytes
+
+ETC1_CHUNK = 2048 # Blocks encoded at a time, bounds the scratch memory
+
+def expand4(c):
+    return (c << 4) | c
+
+def expand5(c):
+    return (c << 3) | (c >> 2)
+
+# Pixels of each half as (blocks, 2, 8, 3), halves in (y, x) order
+def halves(blocks,flip):
+    n = len(blocks)
+    if flip:
+        return np.stack((blocks[:,0:2,:].reshape(n,8,3),
+                         blocks[:,2:4,:].reshape(n,8,3)), axis=1)
+    return np.stack((blocks[:,:,0:2].reshape(n,8,3),
+                     blocks[:,:,2:4].reshape(n,8,3)), axis=1)
+
+# Inverse of halves for the per pixel modifier indices: (blocks, 4, 4)
+def unhalves(m,flip):
+    n = len(m)
+    out = np.empty((n,4,4), dtype=m.dtype)
+    if flip:
+        out[:,0:2,:] = m[:,0].reshape(n,2,4)
+        out[:,2:4,:] = m[:,1].reshape(n,2,4)
+    else:
+        out[:,:,0:2] = m[:,0].reshape(n,4,2)
+        out[:,:,2:4] = m[:,1].reshape(n,4,2)
+    return out
+
+# One flip for a chunk of blocks: (error, high word, modifier indices)
+def encode_flip(blocks,flip):
+    px = halves(blocks,flip).astype(np.int32)
+    avg = px.mean(axis=2)
+
+    c5 = np.clip(np.rint(avg * (31.0 / 255.0)), 0, 31).astype(np.int32)
+    delta = c5[:,1] - c5[:,0]
+    diff = ((delta >= -4) & (delta <= 3)).all(axis=1)
+    c4 = np.clip(np.rint(avg * (15.0 / 255.0)), 0, 15).astype(np.int32)
+    base = np.where(diff[:,None,None], expand5(c5), expand4(c4))
+
+    # (blocks, half, pixel, table, modifier, channel)
+    cand = np.clip(base[:,:,None,None,None,:] +
+                   ETC1_MODIFIERS[None,None,None,:,:,None], 0, 255)
+    err = ((px[:,:,:,None,None,:] - cand) ** 2).sum(axis=5)
+    m = err.argmin(axis=4)
+    terr = err.min(axis=4).sum(axis=2)         # (blocks, half, table)
+    table = terr.argmin(axis=2)                # (blocks, half)
+    total = terr.min(axis=2).sum(axis=1)
+    idx = np.take_along_axis(m, table[:,:,None,None], axis=3)[:,:,:,0]
+
+    d = delta & 7
+    hi_diff = ((c5[:,0,0] << 27) | (d[:,0] << 24) |
+               (c5[:,0,1] << 19) | (d[:,1] << 16) |
+               (c5[:,0,2] << 11) | (d[:,2] << 8) | (1 << 1))
+    hi_ind  = ((c4[:,0,0] << 28) | (c4[:,1,0] << 24) |
+               (c4[:,0,1] << 20) | (c4[:,1,1] << 16) |
+               (c4[:,0,2] << 12) | (c4[:,1,2] << 8))
+    hi = np.where(diff, hi_diff, hi_ind).astype(np.uint32)
+    hi |= ((table[:,0] << 5) | (table[:,1] << 2) | flip).astype(np.uint32)
+    return (total, hi, unhalves(idx,flip))
+
+# (height, width, 3) uint8 -> (blocks high, blocks wide, 2) big endian
+# uint32 words; edges are padded to a multiple of 4 by repetition
+def encode(a):
+    (h, w) = a.shape[0:2]
+    (ph, pw) = ((h + 3) // 4 * 4, (w + 3) // 4 * 4)
+    if (ph, pw) != (h, w):
+        a = np.pad(a, ((0, ph - h), (0, pw - w), (0, 0)), mode='edge')
+    blocks = a.reshape(ph // 4, 4, pw // 4, 4, 3).transpose(0, 2, 1, 3, 4)
+    blocks = blocks.reshape(-1, 4, 4, 3)
+
+    words = np.empty((len(blocks), 2), dtype='>u4')
+    # Bit of pixel (y, x) in the low word is x*4 + y
+    shift = (np.arange(4)[None,:] * 4 + np.arange(4)[:,None]).astype(np.uint32)
+    for first in range(0, len(blocks), ETC1_CHUNK):
+        chunk = blocks[first:first+ETC1_CHUNK]
+        (e0, hi0, m0) = encode_flip(chunk, 0)
+        (e1, hi1, m1) = encode_flip(chunk, 1)
+        use1 = e1 < e0
+        hi = np.where(use1, hi1, hi0)
+        m = np.where(use1[:,None,None], m1, m0).astype(np.uint32)
+        lo = (((m & 1) << shift) | ((m >> 1) << (shift + 16))).sum(axis=(1, 2))
+        words[first:first+len(chunk),0] = hi
+        words[first:first+len(chunk),1] = lo.astype(np.uint32)
+    return words.reshape(ph // 4, pw // 4, 2)
+
+# Blocks as encode() makes them -> (height, width, 3) uint8
+def decode(words,height=None,width=None):
+    (bh, bw) = words.shape[0:2]
+    words = words.reshape(-1, 2)
+    hi = words[:,0].astype(np.int64)
+    lo = words[:,1].astype(np.int64)
+    diff = (hi >> 1) & 1
+    flip = hi & 1
+    table = np.stack(((hi >> 5) & 7, (hi >> 2) & 7), axis=1)
+
+    base = np.empty((len(hi), 2, 3), dtype=np.int64)
+    for (ch, s) in enumerate((27, 19, 11)):
+        c5 = (hi >> s) & 31
+        d = (hi >> (s - 3)) & 7
+        d = np.where(d >= 4, d - 8, d)
+        c4a = (hi >> (s + 1)) & 15
+        c4b = (hi >> (s - 3)) & 15
+        base[:,0,ch] = np.where(diff == 1, expand5(c5), expand4(c4a))
+        base[:,1,ch] = np.where(diff == 1, expand5((c5 + d) & 31), expand4(c4b))
+
+    y = np.arange(4)[:,None]
+    x = np.arange(4)[None,:]
+    shift = x * 4 + y
+    m = ((lo[:,None,None] >> shift) & 1) | (((lo[:,None,None] >> (shift + 16)) & 1) << 1)
+    half = np.where(flip[:,None,None] == 1, (y >= 2) + 0 * x, (x >= 2) + 0 * y)
+    half = half.astype(np.int64)
+    mod = ETC1_MODIFIERS[np.take_along_axis(table, half.reshape(len(hi), 16), axis=1)
+                         .reshape(len(hi), 4, 4), m]
+    rows = np.arange(len(hi))[:,None,None]
+    px = np.clip(base[rows, half] + mod[:,:,:,None], 0, 255).astype(np.uint8)
+    a = px.reshape(bh, bw, 4, 4, 3).transpose(0, 2, 1, 3, 4).reshape(bh * 4, bw * 4, 3)
+    return a[0:height or bh * 4, 0:width or bw * 4]
+
+# words: a already encoded, if it was
+def write_pkm(fname,a,words=None):
+    if words is None:
+        words = encode(a)
+    tmp = '{}.{}.tmp'.format(fname, os.getpid())
+    with open(tmp,'wb') as f:
+        f.write(PKM_HEADER.pack(PKM_MAGIC, PKM_VERSION, PKM_ETC1_RGB_NO_MIPMAPS,
+                                words.shape[1] * 4, words.shape[0] * 4,
+                                a.shape[1], a.shape[0]))
+        f.write(words.tobytes())
+    os.rename(tmp, fname)
+
+# (blocks, width, height) with blocks a read-only memory map of the
+# block data, shaped as encode() returns it
+def read_pkm(fname):
+    mm = np.memmap(fname, dtype=np.uint8, mode='r')
+    (magic, version, format, pw, ph, width, height) = PKM_HEADER.unpack(
+        mm[0:PKM_HEADER.size].tobytes())
+    if magic != PKM_MAGIC or format != PKM_ETC1_RGB_NO_MIPMAPS:
+        raise ValueError('{}: not an ETC1 PKM file'.format(fname))
+    nbytes = (pw // 4) * (ph // 4) * 8
+    if len(mm) < PKM_HEADER.size + nbytes:
+        raise ValueError('{}: truncated'.format(fname))
+    blocks = mm[PKM_HEADER.size:PKM_HEADER.size + nbytes].view('>u4')
+    return (blocks.reshape(ph // 4, pw // 4, 2), width, height)
+
+def psnr(a,b):
+    mse = np.mean((a.astype(np.float64) - b.astype(np.float64)) ** 2)
+    if mse == 0:
+        return float('inf')
+    return 10.0 * np.log10(255.0 ** 2 / mse)
+
+# Validation without a GPU: decodes each .pkm in software and compares it
+# with its source, resampled the same way the asset pipeline does
+def check_assets(asset_dir,min_db):
+    from assets import load_manifest, variant_size
+    from rawcache import decode_image
+    worst = None
+    for profile in sorted(os.listdir(asset_dir)):
+        for (fname, entry) in sorted(load_manifest(asset_dir,profile).items()):
+            if entry.get('format') != 'etc1':
+                continue
+            (words, width, height) = read_pkm(os.path.join(asset_dir,profile,entry['file']))
+            src = decode_image(fname, (width, height))
+            if src.shape[2] == 1:
+                src = np.repeat(src, 3, axis=2)
+            db = psnr(src[:,:,0:3], decode(words, height, width))
+            print ('{:6.2f} dB  {}/{}'.format(db, profile, fname))
+            worst = db if worst is None else min(worst, db)
+    if worst is None:
+        print ('etc1: no ETC1 assets in {}'.format(asset_dir))
+        return True
+    print ('etc1: worst {:.2f} dB'.format(worst))
+    return worst >= min_db
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='ETC1 encode and PSNR validation')
+    parser.add_argument('--encode', nargs=2, metavar=('IMAGE', 'PKM'),
+                        help='Encode an image to an ETC1 .pkm file')
+    parser.add_argument('--psnr', nargs=2, metavar=('IMAGE', 'PKM'),
+                        help='PSNR of a .pkm file against its source image')
+    parser.add_argument('--check', metavar='ASSET_DIR',
+                        help='PSNR of every ETC1 asset built into ASSET_DIR')
+    parser.add_argument('--min_db', default=30.0, type=float,
+                        help='Fail --check below this PSNR')
+    args = parser.parse_args()
+
+    from rawcache import decode_image
+    if args.encode:
+        a = decode_image(args.encode[0])
+        if a.shape[2] == 1:
+            a = np.repeat(a, 3, axis=2)
+        write_pkm(args.encode[1], a[:,:,0:3])
+    if args.psnr:
+        (words, width, height) = read_pkm(args.psnr[1])
+        src = decode_image(args.psnr[0], (width, height))
+        if src.shape[2] == 1:
+            src = np.repeat(src, 3, axis=2)
+        print ('{:.2f} dB'.format(psnr(src[:,:,0:3], decode(words, height, width))))
+    if args.check and not check_assets(args.check, args.min_db):
+        sys.exit(1)
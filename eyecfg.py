@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+
+# Eye configuration that needs no display or GL: output profiles, the art
+# of each eye context and the hack eye art lists.  gecko.py takes its
+# defaults from here, and so does the offline asset build (assets.py),
+# which must not import pi3d.
+
+# On-screen pixels per rendered pixel for each output; fbx2 scales the
+# framebuffer by 50% for the SPI screens (256 -> 128 OLED/TFT, 480 -> 240 IPS)
+DISPLAY_PROFILES = {
+    'hdmi' : 1.0,
+    'oled' : 0.5,
+    'tft'  : 0.5,
+    'ips'  : 0.5,
+}
+
+# Frames per second worth drawing for each output: the HDMI refresh, or
+# what fbx2 can push over SPI, bitrate / (width * height * 16 bits) at its
+# default bitrates (10 MHz 128x128 OLED, 12 MHz 128x128 TFT; the 96 MHz
+# 240x240 IPS manages ~100, capped by the 60 Hz display fbx2 copies from)
+DISPLAY_FRAME_RATES = {
+    'hdmi' : 60.0,
+    'oled' : 38.0,
+    'tft'  : 45.0,
+    'ips'  : 60.0,
+}
+
+#
+# Eye graphics definitions
+#
+EYE_ART = {
+    'cyclops': {
+        'eye.shape': 'graphics/cyclops-eye.svg',
+        'iris.art': 'graphics/iris.jpg',
+        'lid.art': 'graphics/lid.png',
+        'sclera.art': 'graphics/sclera.png'
+    },
+    'dragon': {
+        'eye.shape': 'graphics/dragon-eye.svg',
+        #'iris.art': 'graphics/dragon-iris.jpg',
+        'iris.art': 'hack_graphics/Metal Iris_00145.jpg',
+        'lid.art': 'graphics/lid.png',
+        #'sclera.art': 'graphics/dragon-sclera.png'
+        'sclera.art': 'hack_graphics/Circuit sclera_00000.jpg',
+    },
+    'hack': {
+#       'eye.shape': 'graphics/cyclops-eye.svg',
+        'eye.shape': 'hack_graphics/gecko-eye_playa.svg',
+#       'eye.shape': 'hack_graphics/gecko-eye_0.svg',
+#       'iris.art': 'hack_graphics/iris.jpg',
+
+        # Trent
+        'iris.art': 'hack_graphics/Metal Iris_00145.jpg',
+#       'iris.art': 'hack_graphics/Metal iris animated 1.gif',
+#       'iris.art': 'hack_graphics/Metal Iris animated 2_[00168-00288].gif',
+#       'iris.art': 'graphics/uv.png',
+#       'iris.art': 'hack_graphics/Organic eye_01081.jpg',
+
+#       'iris.art': 'hack_graphics/dragon-iris.jpg',
+        'lid.art': 'hack_graphics/lid.png',
+#       'lid.art': 'graphics/uv.png',
+
+#       'sclera.art': 'hack_graphics/dragon-sclera.png',
+#       'sclera.art': 'hack_graphics/dragon-iris.jpg'
+#       'sclera.art': 'hack_graphics/gecko_s_eye_by_mchahine_d2en705-fullview.jpg'
+#       'sclera.art': 'hack_graphics/leopard-gecko-3381555_960_720.jpg',
+#       'sclera.art': 'hack_graphics/Ds4CWFgV4AAlhWK.jpg_large.jpg',
+#       'sclera.art': 'hack_graphics/sclera.jpg',
+
+        # Trent
+        'sclera.art': 'hack_graphics/Circuit sclera_00000.jpg',
+#       'sclera.art': 'hack_graphics/Organic eye_01081.jpg',
+    },
+}
+
+# First frame of hack_graphics/animations/sclera; the rest of that
+# sequence is this frame with the hue turned 3 degrees per frame
+SCLERA_ANIMATION_ART = 'hack_graphics/animations/sclera/Circuit sclera color rotate_00060.jpg'
+
+# Hack eye art picked at random when there are no eye constraints
+HACK_SCLERAS = [
+    'hack_graphics/Circuit sclera_00000.jpg',
+    'hack_graphics/Circuit sclera_00001.jpg',
+    'hack_graphics/Circuit sclera_00002.jpg',
+    'hack_graphics/Circuit sclera_00003.jpg',
+    'hack_graphics/Circuit sclera_00004.jpg',
+    'hack_graphics/Circuit sclera_00005.jpg',
+    'hack_graphics/Circuit sclera_00006.jpg',
+    'hack_graphics/Circuit sclera_00007.jpg',
+    'hack_graphics/Circuit sclera_00008.jpg',
+    'hack_graphics/Circuit sclera_00009.jpg',
+    'hack_graphics/Circuit sclera_00010.jpg',
+    'hack_graphics/Circuit sclera_00011.jpg',
+    'hack_graphics/Circuit sclera_00012.jpg',
+    'hack_graphics/Circuit sclera_00013.jpg',
+    'hack_graphics/Circuit sclera_00014.jpg',
+    'hack_graphics/Circuit sclera_00015.jpg',
+    'hack_graphics/gecko spiral eyes_01281.jpg',
+    'hack_graphics/gecko spiral eyes_01282.jpg',
+    'hack_graphics/gecko spiral eyes_01283.jpg',
+    'hack_graphics/gecko spiral eyes_01284.jpg',
+    'hack_graphics/gecko spiral eyes_01285.jpg',
+    'hack_graphics/gecko spiral eyes_01286.jpg',
+]
+HACK_IRIS = [
+    'hack_graphics/Metal Iris_00145.jpg',
+    'hack_graphics/Metal Iris_00146.jpg',
+    'hack_graphics/Metal Iris_00147.jpg',
+    'hack_graphics/Metal Iris_00148.jpg',
+    'hack_graphics/Metal Iris_00149.jpg',
+    'hack_graphics/Metal Iris_00150.jpg',
+    'hack_graphics/Metal Iris_00151.jpg',
+    'hack_graphics/Metal Iris_00152.jpg',
+    'hack_graphics/Metal Iris_00153.jpg',
+    'hack_graphics/gecko spiral eyes_01281.jpg',
+    'hack_graphics/gecko spiral eyes_01282.jpg',
+    'hack_graphics/gecko spiral eyes_01283.jpg',
+    'hack_graphics/gecko spiral eyes_01284.jpg',
+    'hack_graphics/gecko spiral eyes_01285.jpg',
+    'hack_graphics/gecko spiral eyes_01286.jpg',
+]
+
+#HACK_IRIS = [
+#    'hack_graphics/gecko spiral eyes_01281.jpg',
+#    'hack_graphics/gecko spiral eyes_01282.jpg',
+#    'hack_graphics/gecko spiral eyes_01283.jpg',
+#    'hack_graphics/gecko spiral eyes_01284.jpg',
+#    'hack_graphics/gecko spiral eyes_01285.jpg',
+#    'hack_graphics/gecko spiral eyes_01286.jpg',
+#]
+
+# Eye constraints spreadsheet: sheet 'eye' has the sclera art across row 0
+# (with the art directory in its first cell), the iris art down column 0,
+# and Y or X where a sclera and iris may be combined.
+# Returns ({(sclera, iris): allowed}, scleras, irises).
+# openpyxl is only needed when there is an xlsx to read.
+def load_eye_constraints(fname):
+    from openpyxl import load_workbook
+    print ('loading eye constraints from: {}'.format(fname))
+    wb = load_workbook(filename = fname)
+    wb_sheet_names = wb.get_sheet_names()
+    print ('# {}'.format(wb_sheet_names))
+
+    constraints = {}
+    fnames_sclera = [None]
+    fnames_iris = [None]
+    dir_graphics = '.'
+
+    for sheet_name in wb_sheet_names:
+        if sheet_name in ['eye']:
+            sheet = wb[sheet_name]
+
+            # Row 0 contains schlera file names
+            # Col 0 contains iris file names
+            # Intersections (row,col) contain boolean if combination is allowed
+            for row_idx,row in enumerate(sheet.iter_rows(min_row=0)):
+                rowlen = len(row)
+                #print (rowlen)
+                #raise
+                if row_idx == 0:
+                    dir_graphics = row[0].value
+
+                    fnames_sclera += ['{}/{}'.format(dir_graphics,
+                                                     row[col_idx].value) \
+                                      for col_idx in range(1,rowlen)]
+
+                    continue
+
+                for col_idx in range(0,rowlen):
+                    cell = row[col_idx]
+                    val = cell.value
+
+                    if col_idx == 0:
+                        fnames_iris.append('{}/{}'.format(dir_graphics,val))
+                        continue
+
+                    if type(val) == str:
+                        val = val.upper()
+
+                    print ('row_idx: {} col_idx: {}'.format(row_idx,col_idx))
+                    key_sclera = fnames_sclera[col_idx]
+                    key_iris = fnames_iris[row_idx]
+                    key = (key_sclera,key_iris)
+                    print ('key: {}'.format(key))
+                    if val in ['Y','X']: # combination permitted
+                        constraints[key] = True
+                    else:
+                        constraints[key] = False
+
+        elif sheet_name in ['wearables']:
+            pass
+        else:
+            print ('Ignoring sheet name: {}'.format(sheet_name))
+
+    print ('fnames_sclera: {}'.format(fnames_sclera))
+    print ('fnames_iris: {}'.format(fnames_iris))
+    return (constraints, fnames_sclera[1:], fnames_iris[1:])
+
+# Every piece of art an eye run may load, for the asset build
+def asset_list(eye_art=EYE_ART,hack_scleras=HACK_SCLERAS,hack_iris=HACK_IRIS,
+               animation_art=SCLERA_ANIMATION_ART):
+    fnames = []
+    for eye_context in sorted(eye_art):
+        for art in ['iris.art', 'sclera.art', 'lid.art']:
+            fnames.append(eye_art[eye_context][art])
+    fnames += hack_scleras + hack_iris
+    fnames.append(animation_art)
+    return fnames
@@ -7,16 +7,26 @@ import math
 import random
 import time
 import argparse
+import numpy as np
 from collections import defaultdict
 import pi3d
-from xml.dom.minidom import parse
 from gfxutil import *
+from geomcache import geom_cache_t
+from atlas import atlas_cache_t
+from prefetch import texture_prefetch_t
+from pupil import pupil_trajectory_t
+from clock import monotonic, fixed_step_t, frame_pacer_t
+from texcache import texture_cache_t, texture_pool_t
+from rawcache import raw_cache_t
+from assets import asset_manifest_t
+from eyecfg import DISPLAY_PROFILES, DISPLAY_FRAME_RATES, EYE_ART, SCLERA_ANIMATION_ART, \
+    HACK_SCLERAS, HACK_IRIS, load_eye_constraints
 from evdev import InputDevice, ecodes
 from joystick import joystick_t
 from keyboard import keyboard_t
+from inputmux import input_mux_t
 from debug import leak_check
 from wearables import wearables_client_t, wearables_server_t
-from openpyxl import load_workbook
 
 # These need to be globals in order to avoid a memory leak
 DISPLAY = pi3d.Display.create(samples=4)
@@ -31,20 +41,90 @@ shader_reflect = pi3d.Shader("uv_reflect") # evenly lighted - perhaps this is go
 #shader = pi3d.Shader("mat_flat") # weird, no lights
 #shader = pi3d.Shader("mat_reflect") # weird
 #shader = pi3d.Shader("uv_toon") # no video
+# uv_light with meshes blended on the GPU (eyelids, iris), see shaders/blend_light.vs
+shader_blend = pi3d.Shader(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                        'shaders', 'blend_light'))
+# uv_light with the texture hue shifted by a uniform (animated sclera), see shaders/hue_light.fs
+shader_hue = pi3d.Shader(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                      'shaders', 'hue_light'))
 
 light  = pi3d.Light(lightpos=(0, -500, -500), lightamb=(0.2, 0.2, 0.2)) # default
 #light  = pi3d.Light(lightpos=(0, -500, -500), lightamb=(0.3, 0.3, 0.3)) 
 #light  = pi3d.Light(lightpos=(0, -500, -500), lightamb=(0.1, 0.1, 0.1)) # too dim
 #light  = pi3d.Light(lightpos=(0, -500, -500), lightamb=(0.8, 0.8, 0.8)) # looks washed out
 
+# Sclera shapes by geometry, shared by every eye context (and restart)
+# that lathes the same outline; textures are set on each context switch
+sclera_cache = {}
+# Loaded textures, shared by all eye contexts and runs
+texture_cache = texture_cache_t()
+
 # Blinking states
 BLINK_NONE = 0
 BLINK_CLOSING = 1
 BLINK_OPENING = 2
 
+# Point lists pulled from the eye shape SVG:
+# (attribute, SVG path id, number of points, closed, reverse, sample group)
+# Lists in the same sample group line up index for index; with adaptive
+# sampling (path_error_px) they share curvature-placed sample positions
+# and the fixed point counts are not used.
+SVG_POINT_LISTS = [
+    ('pupilMinPts'      , "pupilMin"      , 32, True , True , 'iris'    ),
+    #('pupilMinPts'      , "pupilMin"      , 64, True , True , 'iris'    ),
+    ('pupilMaxPts'      , "pupilMax"      , 32, True , True , 'iris'    ),
+    #('pupilMaxPts'      , "pupilMax"      , 64, True , True , 'iris'    ),
+    ('irisPts'          , "iris"          , 32, True , True , 'iris'    ),
+    ('scleraFrontPts'   , "scleraFront"   ,  0, False, False, None      ),
+    ('scleraBackPts'    , "scleraBack"    ,  0, False, False, None      ),
+    ('upperLidClosedPts', "upperLidClosed", 33, False, True , 'upperLid'),
+    ('upperLidOpenPts'  , "upperLidOpen"  , 33, False, True , 'upperLid'),
+    ('upperLidEdgePts'  , "upperLidEdge"  , 33, False, False, 'upperLid'),
+    ('lowerLidClosedPts', "lowerLidClosed", 33, False, False, 'lowerLid'),
+    ('lowerLidOpenPts'  , "lowerLidOpen"  , 33, False, False, 'lowerLid'),
+    ('lowerLidEdgePts'  , "lowerLidEdge"  , 33, False, False, 'lowerLid'),
+]
+
+# Adaptive sampling level of detail per sample group: (min, max) points
+SVG_SAMPLE_GROUPS = {
+    'iris'     : (12, 96),
+    'upperLid' : (9, 97),
+    'lowerLid' : (9, 97),
+}
+
+# Sclera lathe resolution hand-tuned for the full-height WorldEye
+# (eyeRadius 480 / 1.7 on HDMI); other sizes scale from here, keeping
+# about the same on-screen length per side (see sclera_lods())
+SCLERA_SIDES = 256
+SCLERA_STEPS = 24
+SCLERA_PX_PER_SIDE = 2.0 * math.pi * (480 / 1.7) / SCLERA_SIDES
+# pi3d draws with 16 bit (GL_UNSIGNED_SHORT) indices, so a sclera level
+# can have at most this many vertices, (sides + 1) * steps
+SCLERA_MAX_VERTICES = 65535
+
+# Bump when anything baked into the geometry cache is computed differently
+GEOMETRY_CACHE_VERSION = 3
+
+# Texture settings by use; filter and mipmap are part of the texture
+# cache key, blend is not (the sclera and iris share hack art).
+# mipmap=True doesn't look as good, GL_NEAREST doesn't look as good,
+# blend=False on the sclera/lid makes no apparent change
+IRIS_TEXTURE   = {'filter': pi3d.GL_LINEAR, 'blend': False, 'mipmap': False}
+SCLERA_TEXTURE = {'filter': pi3d.GL_LINEAR, 'blend': True, 'mipmap': False}
+LID_TEXTURE    = {'filter': pi3d.GL_LINEAR, 'blend': True, 'mipmap': False}
+
+# GL textures the hack eye art is uploaded into, shared by all runs
+hack_texture_pools = {
+    'iris'   : texture_pool_t(**IRIS_TEXTURE),
+    'sclera' : texture_pool_t(**SCLERA_TEXTURE),
+}
+
 class gecko_eye_t(object):
     def __init__(self,debug=False,EYE_SELECT=None):
         self.debug = debug
+        self.prefetch = texture_prefetch_t(debug=debug) # Next hack eye textures
+        self.pacer = frame_pacer_t() # Replaced in run() once the cfg is parsed
+        self.inputs = input_mux_t(debug=debug) # Input sources, polled once a frame
         self.init_cfg_db()
         self.EYE_SELECT = None
         if EYE_SELECT is not None:
@@ -58,16 +138,17 @@ class gecko_eye_t(object):
         self.keyboard = None
         self.joystick = None
 
-        # Periodically check for new devices connected
-        self.keyboard_last_retry = 0
-        self.joystick_last_retry = 0
+        # Periodically check for new devices connected (None: not tried yet,
+        # so due at once; monotonic() counts from boot, so 0 is not long ago)
+        self.keyboard_last_retry = None
+        self.joystick_last_retry = None
         self.test_joystick_cnt = 0
 
         # Other timer initialization
-        self.time_last_joystick_service = 0
+        self.time_last_joystick_service = None
         self.nxt_emotion_sec = 0
         self.last_v = 0.5
-        self.last_eye_comm_recv = 0
+        self.last_eye_comm_recv = None
         self.event_holdDuration = None
         self.event_moveDuration = None
         self.event_overrideBlinkDurationClose = None
@@ -82,6 +163,20 @@ class gecko_eye_t(object):
     
         self.parse_args()
         self.load_constraints()
+        texture_cache.max_bytes = self.cfg_db['texture_cache_max_bytes']
+        texture_cache.debug = self.debug
+        if self.cfg_db['raw_cache_dir'] is not None:
+            texture_cache.raw = raw_cache_t(cache_dir=self.cfg_db['raw_cache_dir'],
+                                            debug=self.debug)
+        else:
+            texture_cache.raw = None
+        if self.cfg_db['asset_dir'] is not None:
+            texture_cache.assets = asset_manifest_t(asset_dir=self.cfg_db['asset_dir'],
+                                                    profile=self.cfg_db['display_profile'],
+                                                    debug=self.debug)
+        else:
+            texture_cache.assets = None
+        self.prefetch.load = texture_cache.load_pixels
         
         self.eye_contexts = ['cyclops','hack','dragon']
         self.eye_cache = defaultdict(dict)
@@ -90,75 +185,17 @@ class gecko_eye_t(object):
         self.init(self.eye_contexts)
 
     def load_constraints(self):
+        self.fname_sclera = None
+        self.fname_iris = None
+        self.animationMap = None # Sclera texture shared by all eye contexts
         if self.cfg_db['eye_constraints'] is None:
             return
 
-        print ('loading eye constraints from: {}'.format(self.cfg_db['eye_constraints']))
-        wb = load_workbook(filename = self.cfg_db['eye_constraints'])
-        wb_sheet_names = wb.get_sheet_names()
-        print ('# {}'.format(wb_sheet_names))
-
-        fnames_sclera = [None]
-        fnames_iris = [None]
-        dir_graphics = '.'
-        
-        for sheet_name in wb_sheet_names:
-            if sheet_name in ['eye']:
-                sheet = wb[sheet_name]
-                self.eye_constraints = {}
-                
-                # Row 0 contains schlera file names
-                # Col 0 contains iris file names
-                # Intersections (row,col) contain boolean if combination is allowed
-                for row_idx,row in enumerate(sheet.iter_rows(min_row=0)):
-                    rowlen = len(row)
-                    #print (rowlen)
-                    #raise
-                    if row_idx == 0:
-                        dir_graphics = row[0].value
-                        
-                        fnames_sclera += ['{}/{}'.format(dir_graphics,
-                                                         row[col_idx].value) \
-                                          for col_idx in range(1,rowlen)]
-
-                        continue
-                        
-                    for col_idx in range(0,rowlen):
-                        cell = row[col_idx]
-                        val = cell.value
-
-                        if col_idx == 0:
-                            fnames_iris.append('{}/{}'.format(dir_graphics,val))
-                            continue
-                            
-                        if type(val) == str:
-                            val = val.upper()
-
-                        print ('row_idx: {} col_idx: {}'.format(row_idx,col_idx))
-                        key_sclera = fnames_sclera[col_idx]
-                        key_iris = fnames_iris[row_idx]
-                        key = (key_sclera,key_iris)
-                        print ('key: {}'.format(key))
-                        if val in ['Y','X']: # combination permitted
-                            self.eye_constraints[key] = True
-                        else:
-                            self.eye_constraints[key] = False
-
-            elif sheet_name in ['wearables']:
-                pass
-            else:
-                print ('Ignoring sheet name: {}'.format(sheet_name))
-
-        print ('fnames_sclera: {}'.format(fnames_sclera))
-        print ('fnames_iris: {}'.format(fnames_iris))
-        dir_graphics = 'hack_graphics'
-        self.hack_scleras = fnames_sclera[1:]
-        self.hack_iris = fnames_iris[1:]
-        
+        (self.eye_constraints,
+         self.hack_scleras,
+         self.hack_iris) = load_eye_constraints(self.cfg_db['eye_constraints'])
         #print ('eye_constraints: {}'.format(self.eye_constraints))
-        self.fname_sclera = None
-        self.fname_iris = None
-        
+
     def parse_args(self):
         self.parser = argparse.ArgumentParser(description="Parse arguments")
         self.parser.add_argument('--demo',
@@ -230,6 +267,74 @@ class gecko_eye_t(object):
                                  default=self.cfg_db['eye_constraints'],
                                  action='store',
                                  help='Eye art combination constraints')
+        self.parser.add_argument('--iris_cache_lazy',
+                                 default=self.cfg_db['iris_cache_lazy'],
+                                 action='store_true',
+                                 help='Build cached iris meshes on first use')
+        self.parser.add_argument('--geometry_cache_dir',
+                                 default=self.cfg_db['geometry_cache_dir'],
+                                 action='store',
+                                 help='Baked eye geometry directory (None: disable)')
+        self.parser.add_argument('--path_error_px',
+                                 default=self.cfg_db['path_error_px'],
+                                 action='store',
+                                 help='Eye outline sampling error in pixels (None: fixed point counts)')
+        self.parser.add_argument('--display_profile',
+                                 default=self.cfg_db['display_profile'],
+                                 action='store',
+                                 help='Output display: {}'.format(', '.join(sorted(DISPLAY_PROFILES))))
+        self.parser.add_argument('--lid_shader',
+                                 default=int(self.cfg_db['lid_shader']),
+                                 action='store',type=int,
+                                 help='Eyelid motion on the GPU - 0:CPU mesh regen 1:blend shader')
+        self.parser.add_argument('--iris_shader',
+                                 default=int(self.cfg_db['iris_shader']),
+                                 action='store',type=int,
+                                 help='Pupil dilation on the GPU - 0:CPU mesh cache 1:blend shader')
+        self.parser.add_argument('--sclera_animation',
+                                 default=self.cfg_db['sclera_animation'],
+                                 action='store_true',
+                                 help='Color-cycle the sclera (hue rotation shader)')
+        self.parser.add_argument('--sclera_atlas',
+                                 default=self.cfg_db['sclera_atlas'],
+                                 action='store',
+                                 help='Directory of sclera animation frames, played from a texture atlas')
+        self.parser.add_argument('--texture_cache_max_bytes',
+                                 default=self.cfg_db['texture_cache_max_bytes'],
+                                 action='store',
+                                 help='Texture memory kept resident for reuse (None: no cap)')
+        self.parser.add_argument('--raw_cache_dir',
+                                 default=self.cfg_db['raw_cache_dir'],
+                                 action='store',
+                                 help='Decoded texture cache directory (None: decode every load)')
+        self.parser.add_argument('--asset_dir',
+                                 default=self.cfg_db['asset_dir'],
+                                 action='store',
+                                 help='Per display profile art variants (None: original art)')
+        self.parser.add_argument('--hack_texture_pool',
+                                 default=int(self.cfg_db['hack_texture_pool']),
+                                 action='store',type=int,
+                                 help='Hack eye art - 0:new textures 1:upload into a fixed texture pair')
+        self.parser.add_argument('--hack_prefetch',
+                                 default=int(self.cfg_db['hack_prefetch']),
+                                 action='store',type=int,
+                                 help='Hack eye textures - 0:load at switch 1:decode ahead 2:decode and upload ahead')
+        self.parser.add_argument('--sim_rate_hz',
+                                 default=self.cfg_db['sim_rate_hz'],
+                                 action='store',type=float,
+                                 help='Eye state (gaze, blinks, lid tracking) steps per second')
+        self.parser.add_argument('--skip_unchanged',
+                                 default=int(self.cfg_db['skip_unchanged']),
+                                 action='store',type=int,
+                                 help='Frames that would look the same - 0:redraw 1:skip draw and swap')
+        self.parser.add_argument('--frame_rate',
+                                 default=self.cfg_db['frame_rate'],
+                                 action='store',
+                                 help='Frames per second limit (default: by display profile, 0: no limit)')
+        self.parser.add_argument('--sclera_lod',
+                                 default=self.cfg_db['sclera_lod'],
+                                 action='store',type=int,
+                                 help='Initial sclera detail level (0: finest)')
                            
         # Parse the arguments
         args = self.parser.parse_args()
@@ -259,6 +364,48 @@ class gecko_eye_t(object):
         self.cfg_db['joystick_mode'] = args.joystick_mode
         self.cfg_db['joystick_service_interval_sec'] = args.joystick_service_interval_sec
         self.cfg_db['move_fast_duration_joystick_sec'] = args.move_fast_duration_joystick_sec
+        self.cfg_db['iris_cache_lazy'] = args.iris_cache_lazy
+        if args.geometry_cache_dir in ["None"]:
+            self.cfg_db['geometry_cache_dir'] = None
+        else:
+            self.cfg_db['geometry_cache_dir'] = args.geometry_cache_dir
+        if args.display_profile not in DISPLAY_PROFILES:
+            print ('** ERROR: Display profile must be one of: {}'.format(
+                ', '.join(sorted(DISPLAY_PROFILES))))
+            sys.exit(1)
+        self.cfg_db['display_profile'] = args.display_profile
+        self.cfg_db['sclera_lod'] = args.sclera_lod
+        self.cfg_db['lid_shader'] = (args.lid_shader != 0)
+        self.cfg_db['iris_shader'] = (args.iris_shader != 0)
+        self.cfg_db['sclera_animation'] = args.sclera_animation
+        self.cfg_db['hack_prefetch'] = args.hack_prefetch
+        self.cfg_db['hack_texture_pool'] = (args.hack_texture_pool != 0)
+        self.cfg_db['sim_rate_hz'] = args.sim_rate_hz
+        self.cfg_db['skip_unchanged'] = (args.skip_unchanged != 0)
+        if args.frame_rate in [None, "None"]:
+            self.cfg_db['frame_rate'] = DISPLAY_FRAME_RATES[self.cfg_db['display_profile']]
+        else:
+            self.cfg_db['frame_rate'] = float(args.frame_rate)
+        if args.raw_cache_dir in [None, "None"]:
+            self.cfg_db['raw_cache_dir'] = None
+        else:
+            self.cfg_db['raw_cache_dir'] = args.raw_cache_dir
+        if args.asset_dir in [None, "None"]:
+            self.cfg_db['asset_dir'] = None
+        else:
+            self.cfg_db['asset_dir'] = args.asset_dir
+        if args.texture_cache_max_bytes in [None, "None"]:
+            self.cfg_db['texture_cache_max_bytes'] = None
+        else:
+            self.cfg_db['texture_cache_max_bytes'] = int(args.texture_cache_max_bytes)
+        if args.sclera_atlas in [None, "None"]:
+            self.cfg_db['sclera_atlas'] = None
+        else:
+            self.cfg_db['sclera_atlas'] = args.sclera_atlas
+        if args.path_error_px in [None, "None"]:
+            self.cfg_db['path_error_px'] = None
+        else:
+            self.cfg_db['path_error_px'] = float(args.path_error_px)
         
         assert (not (self.cfg_db['demo'] and self.cfg_db['playa']))
         
@@ -343,51 +490,37 @@ class gecko_eye_t(object):
             'joystick_retry_init_sec' : (2*60), # 5 mins
             'keyboard_retry_init_sec' : (60*60), # 1 hour
 
+            'iris_cache_max_bytes' : (1 << 20), # Per eye context, None: no cap
+            'iris_cache_lazy' : False, # Build iris meshes on first use (low RAM)
+            'geometry_cache_dir' : 'cache/geometry', # None: always rebuild geometry
+            'path_error_px' : 0.5, # Adaptive SVG sampling error, None: fixed point counts
+            'display_profile' : 'hdmi', # Output device, see DISPLAY_PROFILES
+            'sclera_lods' : 3, # Sclera detail levels kept per eye context
+            'sclera_lod' : 0, # Initial sclera detail level (0: finest)
+            'lid_shader' : True, # Blend eyelids open/closed on the GPU
+            'iris_shader' : True, # Blend pupil min/max size on the GPU
+            'sclera_animation' : False, # Color-cycle the sclera on the GPU
+            'sclera_animation.art' : SCLERA_ANIMATION_ART,
+            'sclera_animation_deg_per_sec' : 90.0, # 3 degrees/frame at 30 fps
+            'sclera_atlas' : None, # Frame sequence dir to animate the sclera, e.g. hack_graphics/animations/sclera
+            'sclera_atlas_fps' : 30.0, # Sclera atlas playback rate
+            'sclera_atlas_frame_px' : 252, # Frame size in the atlas, None: as the files
+            'atlas_cache_dir' : 'cache/atlas', # Packed atlas pages
+            'texture_cache_max_bytes' : (64 << 20), # Resident textures, None: no cap
+            'raw_cache_dir' : 'cache/raw', # Decoded art, None: decode the files every load
+            'asset_dir' : 'cache/assets', # Art resampled per display profile, None: original art
+            'hack_prefetch' : 2, # Next hack eye: 0 load at switch, 1 decode ahead, 2 decode+upload ahead
+            'hack_texture_pool' : True, # Reuse fixed GL textures for hack eye art
+            'sim_rate_hz' : 60.0, # Eye state steps per second, independent of frame rate
+            'skip_unchanged' : True, # No draw or swap for frames that would look the same
+            'frame_rate' : None, # Frame limit, None: by display_profile (DISPLAY_FRAME_RATES), 0: none
+
             #
             # Eye graphics definitions
             #
-            'cyclops': {
-		'eye.shape': 'graphics/cyclops-eye.svg',
-		'iris.art': 'graphics/iris.jpg',
-		'lid.art': 'graphics/lid.png',
-		'sclera.art': 'graphics/sclera.png'
-		},
-            'dragon': {
-		'eye.shape': 'graphics/dragon-eye.svg',
-		#'iris.art': 'graphics/dragon-iris.jpg',
-		'iris.art': 'hack_graphics/Metal Iris_00145.jpg',                
-		'lid.art': 'graphics/lid.png',
-		#'sclera.art': 'graphics/dragon-sclera.png'
-                'sclera.art': 'hack_graphics/Circuit sclera_00000.jpg',
-            },
-            'hack': {
-#		'eye.shape': 'graphics/cyclops-eye.svg',                
-		'eye.shape': 'hack_graphics/gecko-eye_playa.svg',
-#		'eye.shape': 'hack_graphics/gecko-eye_0.svg',                
-#		'iris.art': 'hack_graphics/iris.jpg',
-
-                # Trent
-		'iris.art': 'hack_graphics/Metal Iris_00145.jpg',
-#		'iris.art': 'hack_graphics/Metal iris animated 1.gif',
-#		'iris.art': 'hack_graphics/Metal Iris animated 2_[00168-00288].gif',
-#		'iris.art': 'graphics/uv.png',                
-#		'iris.art': 'hack_graphics/Organic eye_01081.jpg',                
-                
-#		'iris.art': 'hack_graphics/dragon-iris.jpg',                
-		'lid.art': 'hack_graphics/lid.png',
-#		'lid.art': 'graphics/uv.png',                
-                
-#		'sclera.art': 'hack_graphics/dragon-sclera.png',
-#		'sclera.art': 'hack_graphics/dragon-iris.jpg'
-#		'sclera.art': 'hack_graphics/gecko_s_eye_by_mchahine_d2en705-fullview.jpg'
-#                'sclera.art': 'hack_graphics/leopard-gecko-3381555_960_720.jpg',
-#                'sclera.art': 'hack_graphics/Ds4CWFgV4AAlhWK.jpg_large.jpg',
-#                'sclera.art': 'hack_graphics/sclera.jpg',
-
-                # Trent
-                'sclera.art': 'hack_graphics/Circuit sclera_00000.jpg',
-#		'sclera.art': 'hack_graphics/Organic eye_01081.jpg',                
-	    },
+            'cyclops': dict(EYE_ART['cyclops']),
+            'dragon': dict(EYE_ART['dragon']),
+            'hack': dict(EYE_ART['hack']),
             'eye_constraints' : None,
             
             #
@@ -408,56 +541,8 @@ class gecko_eye_t(object):
 	    'graphics/dragon-eye.svg',            
         ]
         
-        self.hack_scleras = [
-            'hack_graphics/Circuit sclera_00000.jpg',
-            'hack_graphics/Circuit sclera_00001.jpg',
-            'hack_graphics/Circuit sclera_00002.jpg',
-            'hack_graphics/Circuit sclera_00003.jpg',
-            'hack_graphics/Circuit sclera_00004.jpg',
-            'hack_graphics/Circuit sclera_00005.jpg',
-            'hack_graphics/Circuit sclera_00006.jpg',
-            'hack_graphics/Circuit sclera_00007.jpg',
-            'hack_graphics/Circuit sclera_00008.jpg',
-            'hack_graphics/Circuit sclera_00009.jpg',
-            'hack_graphics/Circuit sclera_00010.jpg',
-            'hack_graphics/Circuit sclera_00011.jpg',
-            'hack_graphics/Circuit sclera_00012.jpg',
-            'hack_graphics/Circuit sclera_00013.jpg',
-            'hack_graphics/Circuit sclera_00014.jpg',
-            'hack_graphics/Circuit sclera_00015.jpg',
-            'hack_graphics/gecko spiral eyes_01281.jpg',
-            'hack_graphics/gecko spiral eyes_01282.jpg',
-            'hack_graphics/gecko spiral eyes_01283.jpg',
-            'hack_graphics/gecko spiral eyes_01284.jpg',
-            'hack_graphics/gecko spiral eyes_01285.jpg',
-            'hack_graphics/gecko spiral eyes_01286.jpg',
-        ]
-        self.hack_iris = [
-	    'hack_graphics/Metal Iris_00145.jpg',
-	    'hack_graphics/Metal Iris_00146.jpg',
-	    'hack_graphics/Metal Iris_00147.jpg',
-	    'hack_graphics/Metal Iris_00148.jpg',
-	    'hack_graphics/Metal Iris_00149.jpg',
-	    'hack_graphics/Metal Iris_00150.jpg',
-	    'hack_graphics/Metal Iris_00151.jpg',
-	    'hack_graphics/Metal Iris_00152.jpg',
-	    'hack_graphics/Metal Iris_00153.jpg',
-            'hack_graphics/gecko spiral eyes_01281.jpg',
-            'hack_graphics/gecko spiral eyes_01282.jpg',
-            'hack_graphics/gecko spiral eyes_01283.jpg',
-            'hack_graphics/gecko spiral eyes_01284.jpg',
-            'hack_graphics/gecko spiral eyes_01285.jpg',
-            'hack_graphics/gecko spiral eyes_01286.jpg',
-        ]
-
-#        self.hack_iris = [
-#            'hack_graphics/gecko spiral eyes_01281.jpg',
-#            'hack_graphics/gecko spiral eyes_01282.jpg',
-#            'hack_graphics/gecko spiral eyes_01283.jpg',
-#            'hack_graphics/gecko spiral eyes_01284.jpg',
-#            'hack_graphics/gecko spiral eyes_01285.jpg',
-#            'hack_graphics/gecko spiral eyes_01286.jpg',
-#        ]
+        self.hack_scleras = list(HACK_SCLERAS)
+        self.hack_iris = list(HACK_IRIS)
 
     def switch_eye_context(self,eye_context):
         if eye_context is None:
@@ -465,12 +550,11 @@ class gecko_eye_t(object):
 
         if eye_context in ['hack']:
             self.load_textures(eye_context)
-            self.iris.set_textures([self.irisMap])
-            self.eye.set_textures([self.scleraMap])            
             #self.init_svg(eye_context)
             
         #print (self.eye_cache[eye_context])
         self.vb = self.eye_cache[eye_context]['vb']
+        self.uCoords = self.eye_cache[eye_context]['uCoords']
         self.pupilMinPts = self.eye_cache[eye_context]['pupilMinPts']
         self.pupilMaxPts = self.eye_cache[eye_context]['pupilMaxPts']
         self.irisPts = self.eye_cache[eye_context]['irisPts']
@@ -485,16 +569,28 @@ class gecko_eye_t(object):
         self.irisMap = self.eye_cache[eye_context]['irisMap']
         self.scleraMap = self.eye_cache[eye_context]['scleraMap']
         self.lidMap = self.eye_cache[eye_context]['lidMap']
-        self.eye = self.eye_cache[eye_context]['eye']
+        self.scleraLods = self.eye_cache[eye_context]['scleraLods']
+        self.eye = self.scleraLods[min(self.scleraLod, len(self.scleraLods) - 1)]
         self.iris = self.eye_cache[eye_context]['iris']
         self.irisZ = self.eye_cache[eye_context]['irisZ']
+        self.irisCache = self.eye_cache[eye_context]['irisCache']
+        self.irisRegenThreshold = self.eye_cache[eye_context]['irisRegenThreshold']
         self.upperEyelid = self.eye_cache[eye_context]['upperEyelid']
         self.lowerEyelid = self.eye_cache[eye_context]['lowerEyelid']
+        self.upperLidTable = self.eye_cache[eye_context]['upperLidTable']
+        self.lowerLidTable = self.eye_cache[eye_context]['lowerLidTable']
+        self.upperLidRegenThreshold = self.eye_cache[eye_context]['upperLidRegenThreshold']
+        self.lowerLidRegenThreshold = self.eye_cache[eye_context]['lowerLidRegenThreshold']
         
         if not self.eye_cache[eye_context]['geometry_initialized']:
             self.eye_cache[eye_context]['geometry_initialized'] = True
             self.init_geometry(eye_context)
 
+        # The sclera shape may be shared with other contexts, and hack
+        # contexts pick new art on every switch
+        self.iris.set_textures([self.irisMap])
+        self.eye.set_textures([self.scleraMap])
+
         #self.init_geometry_iris()
         #self.init_geometry_eyelids()
         #self.init_geometry_sclera()
@@ -507,14 +603,20 @@ class gecko_eye_t(object):
         # Eye context dependent
         
         # Load animations
-        if False:
+        if self.cfg_db['sclera_animation'] or self.cfg_db['sclera_atlas'] is not None:
             self.load_animations()
                         
-        # Build eyes
+        self.scleraLod = self.cfg_db['sclera_lod']
+
+        # Build eyes; geometry baked by an earlier run skips the SVG work
+        self.geom_cache = geom_cache_t(cache_dir=self.cfg_db['geometry_cache_dir'],
+                                       debug=self.debug)
         for eye_context in eye_contexts:
-            self.init_svg(eye_context)
+            baked = self.load_geometry(eye_context)
+            if not baked:
+                self.init_svg(eye_context)
             self.load_textures(eye_context)
-            self.init_geometry(eye_context)
+            self.init_geometry(eye_context,baked)
             self.eye_cache[eye_context]['geometry_initialized'] = True
             self.init_globals()
             
@@ -562,17 +664,20 @@ class gecko_eye_t(object):
         self.eye_client = wearables_client_t(self.debug,
                                              mcaddr=self.cfg_db['mcaddr_eyes'],
                                              port=self.cfg_db['port_eyes'])
+        self.inputs.register('eye_comm', self.eye_client.s)
         
     def init_wearables(self):
         self.wearables_msg_cnt = 0
         self.wearables_client = wearables_client_t(self.debug,
                                                    mcaddr=self.cfg_db['mcaddr_wearables'],
                                                    port=self.cfg_db['port_wearables'])
+        self.inputs.register('wearables', self.wearables_client.s)
         
     def init_joystick(self):
         if self.joystick is None:
-            now = time.time()
-            if now - self.joystick_last_retry <= self.cfg_db['joystick_retry_init_sec']:
+            now = monotonic()
+            if self.joystick_last_retry is not None and \
+               now - self.joystick_last_retry <= self.cfg_db['joystick_retry_init_sec']:
                 return
 
             self.joystick_last_retry = now
@@ -588,28 +693,34 @@ class gecko_eye_t(object):
             # Set up state kept from events sampled from joystick
             if self.joystick.get_status():
                 self.update_eye_events(reset=True)
+                self.inputs.register('joystick', self.joystick.joystick)
             else:
                 self.joystick = None
-            self.debug_joystick_sec = 0
+            self.debug_joystick_sec = None
         else:
             if not self.joystick.get_status():
                 self.joystick = None
+                self.inputs.unregister('joystick')
 
     def init_keyboard(self):
         if self.keyboard is None:
-            now = time.time()
-            if now - self.keyboard_last_retry <= self.cfg_db['keyboard_retry_init_sec']:
+            now = monotonic()
+            if self.keyboard_last_retry is not None and \
+               now - self.keyboard_last_retry <= self.cfg_db['keyboard_retry_init_sec']:
                 return
 
             self.keyboard_last_retry = now
 
             device_name = self.find_input_device('keyboard')
             self.keyboard = keyboard_t(device_name)
-            if not self.keyboard.get_status():
+            if self.keyboard.get_status():
+                self.inputs.register('keyboard', self.keyboard.keyboard)
+            else:
                 self.keyboard = None
         else:
             if not self.keyboard.get_status():
                 self.keyboard = None
+                self.inputs.unregister('keyboard')
             
     def init_svg(self,eye_context=None):
         # Load SVG file, extract paths & convert to point lists --------------------
@@ -618,35 +729,100 @@ class gecko_eye_t(object):
         # Iris & pupil have been scaled down slightly in this version to compensate
         # for how the WorldEye distorts things...looks OK on WorldEye now but might
         # seem small and silly if used with the regular OLED/TFT code.
-        dom                    = parse(self.cfg_db[eye_context]['eye.shape'])        
-        self.vb                = getViewBox(dom)
-        self.pupilMinPts       = getPoints(dom, "pupilMin"      , 32, True , True )
-        #self.pupilMinPts       = getPoints(dom, "pupilMin"      , 64, True , True )        
-        self.pupilMaxPts       = getPoints(dom, "pupilMax"      , 32, True , True )
-        #self.pupilMaxPts       = getPoints(dom, "pupilMax"      , 64, True , True )        
-        self.irisPts           = getPoints(dom, "iris"          , 32, True , True )
-        self.scleraFrontPts    = getPoints(dom, "scleraFront"   ,  0, False, False)
-        self.scleraBackPts     = getPoints(dom, "scleraBack"    ,  0, False, False)
-        self.upperLidClosedPts = getPoints(dom, "upperLidClosed", 33, False, True )
-        self.upperLidOpenPts   = getPoints(dom, "upperLidOpen"  , 33, False, True )
-        self.upperLidEdgePts   = getPoints(dom, "upperLidEdge"  , 33, False, False)
-        self.lowerLidClosedPts = getPoints(dom, "lowerLidClosed", 33, False, False)
-        self.lowerLidOpenPts   = getPoints(dom, "lowerLidOpen"  , 33, False, False)
-        self.lowerLidEdgePts   = getPoints(dom, "lowerLidEdge"  , 33, False, False)
+        svg     = svg_index_t(self.cfg_db[eye_context]['eye.shape'])
+        self.vb = getViewBox(svg)
+
+        # Sample positions shared by each group of point lists, placed by
+        # curvature to hold the outline within path_error_px on screen
+        self.uCoords = {}
+        if self.cfg_db['path_error_px'] is not None:
+            # SVG units per pixel once scalePoints() has sized the eye
+            tolerance = (self.cfg_db['path_error_px'] *
+                         min(self.vb[2], self.vb[3]) / (self.eyeRadius * 2.0))
+            for group in SVG_SAMPLE_GROUPS:
+                entries = [e for e in SVG_POINT_LISTS if e[5] == group]
+                (minPoints, maxPoints) = SVG_SAMPLE_GROUPS[group]
+                self.uCoords[group] = adaptiveCoords([getPath(svg, e[1]) for e in entries],
+                                                     [e[4] for e in entries],
+                                                     entries[0][3], tolerance,
+                                                     minPoints, maxPoints)
+
+        for (name, id, numPoints, closed, reverse, group) in SVG_POINT_LISTS:
+            if group in self.uCoords:
+                setattr(self, name, getPointsAt(svg, id, self.uCoords[group], closed, reverse))
+            else:
+                setattr(self, name, getPoints(svg, id, numPoints, closed, reverse))
 
         if eye_context is not None:
             self.eye_cache[eye_context]['vb'] = self.vb
-            self.eye_cache[eye_context]['pupilMinPts'] = self.pupilMinPts
-            self.eye_cache[eye_context]['pupilMaxPts'] = self.pupilMaxPts
-            self.eye_cache[eye_context]['irisPts'] = self.irisPts
-            self.eye_cache[eye_context]['scleraFrontPts'] = self.scleraFrontPts
-            self.eye_cache[eye_context]['scleraBackPts'] = self.scleraBackPts
-            self.eye_cache[eye_context]['upperLidClosedPts'] = self.upperLidClosedPts
-            self.eye_cache[eye_context]['upperLidOpenPts'] = self.upperLidOpenPts
-            self.eye_cache[eye_context]['upperLidEdgePts'] = self.upperLidEdgePts
-            self.eye_cache[eye_context]['lowerLidClosedPts'] = self.lowerLidClosedPts
-            self.eye_cache[eye_context]['lowerLidOpenPts'] = self.lowerLidOpenPts
-            self.eye_cache[eye_context]['lowerLidEdgePts'] = self.lowerLidEdgePts            
+            self.eye_cache[eye_context]['uCoords'] = self.uCoords
+            for (name, id, numPoints, closed, reverse, group) in SVG_POINT_LISTS:
+                self.eye_cache[eye_context][name] = getattr(self, name)
+
+    def geometry_key(self,eye_context):
+        # Everything the baked geometry depends on besides the SVG itself
+        return self.geom_cache.key(self.cfg_db[eye_context]['eye.shape'],
+                                   GEOMETRY_CACHE_VERSION,
+                                   repr(self.eyeRadius),
+                                   SVG_POINT_LISTS,
+                                   self.cfg_db['path_error_px'],
+                                   sorted(SVG_SAMPLE_GROUPS.items()),
+                                   self.cfg_db['eye_orientation'],
+                                   self.sclera_tex_offset(),
+                                   self.sclera_lods())
+
+    def load_geometry(self,eye_context):
+        # Pick up scaled point lists, regen thresholds, iris depth and the
+        # sclera buffers baked by an earlier run; False if not available
+        if self.cfg_db['geometry_cache_dir'] is None:
+            return False
+
+        baked = self.geom_cache.load(self.geometry_key(eye_context))
+        if baked is None:
+            return False
+
+        (arrays, scalars) = baked
+        self.vb = tuple(scalars['vb'])
+        for (name, id, numPoints, closed, reverse, group) in SVG_POINT_LISTS:
+            setattr(self, name, arrays[name])
+        self.irisRegenThreshold = scalars['irisRegenThreshold']
+        self.upperLidRegenThreshold = scalars['upperLidRegenThreshold']
+        self.lowerLidRegenThreshold = scalars['lowerLidRegenThreshold']
+        self.irisZ = scalars['irisZ']
+        self.scleraBufs = [(arrays['scleraBuf.{}'.format(level)],
+                            arrays['scleraIdx.{}'.format(level)])
+                           for level in range(len(self.sclera_lods()))]
+        self.uCoords = {}
+        for group in SVG_SAMPLE_GROUPS:
+            if '{}.uCoords'.format(group) in arrays:
+                self.uCoords[group] = arrays['{}.uCoords'.format(group)]
+
+        self.eye_cache[eye_context]['vb'] = self.vb
+        self.eye_cache[eye_context]['uCoords'] = self.uCoords
+        for (name, id, numPoints, closed, reverse, group) in SVG_POINT_LISTS:
+            self.eye_cache[eye_context][name] = getattr(self, name)
+        return True
+
+    def save_geometry(self,eye_context):
+        if self.cfg_db['geometry_cache_dir'] is None:
+            return
+
+        arrays = {}
+        for (name, id, numPoints, closed, reverse, group) in SVG_POINT_LISTS:
+            arrays[name] = getattr(self, name)
+        for (level, shape) in enumerate(self.scleraLods):
+            arrays['scleraBuf.{}'.format(level)] = shape.buf[0].array_buffer
+            arrays['scleraIdx.{}'.format(level)] = shape.buf[0].element_array_buffer
+        for group in self.uCoords:
+            arrays['{}.uCoords'.format(group)] = self.uCoords[group]
+        scalars = {
+            'vb' : list(self.vb),
+            'irisRegenThreshold' : float(self.irisRegenThreshold),
+            'upperLidRegenThreshold' : float(self.upperLidRegenThreshold),
+            'lowerLidRegenThreshold' : float(self.lowerLidRegenThreshold),
+            'irisZ' : float(self.irisZ),
+        }
+        self.geom_cache.save(self.geometry_key(eye_context), arrays, scalars)
 
     def init_display(self):
         global DISPLAY
@@ -665,6 +841,8 @@ class gecko_eye_t(object):
                 self.eyeRadius   = self.DISPLAY.height / 1.7 #1.6 eye spills off screen
         else:
             self.eyeRadius   = self.DISPLAY.height * 2.0 / 5.0
+        # Gaze change (degrees) that moves the front of the eye 1/2 pixel
+        self.gazeRedrawThreshold = 0.5 / (self.eyeRadius * math.pi / 180.0)
 
         # A 2D camera is used, mostly to allow for pixel-accurate eye placement,
         # but also because perspective isn't really helpful or needed here, and
@@ -700,142 +878,328 @@ class gecko_eye_t(object):
         
         return (fname_sclera,fname_iris)
 
+    # The sclera animation is an HSV hue shift of its first frame, so
+    # instead of a texture per frame it is one texture with its hue shifted
+    # by shader_hue; the angle comes from the clock (see draw_eye), not the
+    # frame count, and cycles through all 360 degrees.
+    # Sequences that are not a color rotation (sclera_atlas) are packed
+    # into a few atlas pages and played by moving the texture offset.
     def load_animations(self,defer_loading=False,eye_context=None):
-        dir = 'hack_graphics/animations/sclera'
-        from os import listdir
-        from os.path import isfile, join
-        flist = ['{}'.format(join(dir,f)) for f in listdir(dir) if isfile(join(dir, f))]
-        self.animation_frame = 0
-        self.animations = []
-        for fname in sorted(flist):
-            print ('anim fname: {}'.format(fname))
-            animation = pi3d.Texture(fname,
-                                     mipmap=False, # True, doesn't look as good
-                                     defer=defer_loading,                                      
-                                     filter=pi3d.GL_LINEAR,
-                                     blend=True)
-            self.animations.append(animation)
+        if self.cfg_db['sclera_atlas'] is not None:
+            # A sub-rectangle cannot wrap, so the atlas frames carry the
+            # lathe's texture offset (see init_geometry_sclera)
+            roll = 0.5 if self.cfg_db['eye_orientation'] in ['left'] else 0.0
+            atlas = atlas_cache_t(cache_dir=self.cfg_db['atlas_cache_dir'],
+                                  debug=self.debug).get(
+                                      self.cfg_db['sclera_atlas'],
+                                      frame_px=self.cfg_db['sclera_atlas_frame_px'],
+                                      roll=roll)
+            self.animationPages = [texture_cache.get(fname,
+                                                     defer=defer_loading,
+                                                     **SCLERA_TEXTURE)
+                                   for fname in atlas['pages']]
+            self.animationRects = atlas['rects']
+            self.animationName = atlas['pages'][0]
+            self.animationMap = self.animationPages[0]
+        else:
+            self.animationName = self.cfg_db['sclera_animation.art']
+            print ('anim fname: {}'.format(self.animationName))
+            self.animationMap = texture_cache.get(self.animationName,
+                                                  defer=defer_loading,
+                                                  **SCLERA_TEXTURE)
+        self.animationStart = monotonic()
         
     def load_textures(self,eye_context=None):
         # Load texture maps --------------------------------------------------------
 
         defer_loading = False # Pre-cache textures at setup
+        irisMap = None
+        scleraMap = None
         if eye_context in ['hack']:
-            (self.fname_sclera,
-             self.fname_iris) = self.constrained_random_eye()
+            prefetched = self.prefetch.take()
+            if prefetched is not None:
+                ((self.fname_sclera,
+                  self.fname_iris),
+                 (scleraMap,
+                  irisMap)) = prefetched
+            else:
+                (self.fname_sclera,
+                 self.fname_iris) = self.constrained_random_eye()
+                irisMap = self.hack_texture('iris',self.fname_iris)
+                if self.animationMap is None:
+                    scleraMap = self.hack_texture('sclera',self.fname_sclera)
         else:
             self.fname_iris = self.cfg_db[eye_context]['iris.art']
             self.fname_sclera = self.cfg_db[eye_context]['sclera.art']
 
+        if self.animationMap is not None:
+            self.fname_sclera = self.animationName
+
         print ('fname_sclera: {}'.format(self.fname_sclera))            
         print ('fname_iris: {}'.format(self.fname_iris))
         #print ('fname_eye_shape: {}'.format(self.cfg_db[eye_context]['eye.shape']))
 
-        self.irisMap = pi3d.Texture(self.fname_iris,
-                                    mipmap=False, # True, doesn't look as good
-                                    defer=defer_loading,
-                                    filter=pi3d.GL_LINEAR
-#                                   filter=pi3d.GL_NEAREST  # Doesn't look as good
-        )
-        self.scleraMap = pi3d.Texture(self.fname_sclera,
-                                      mipmap=False, # True, doesn't look as good
-                                      defer=defer_loading,                                      
-                                      filter=pi3d.GL_LINEAR,
-#                                     filter=pi3d.GL_NEAREST, # Doesn't look as good
-                                      blend=True
-#                                     blend=False # No apparent change
-        )
-        self.lidMap = pi3d.Texture(self.cfg_db[eye_context]['lid.art'],
-                                   mipmap=False, # True, doesn't look as good
-                                   filter=pi3d.GL_LINEAR,
-                                   defer=defer_loading,                                   
-#                                  filter=pi3d.GL_NEAREST, # Doesn't look as good
-                                   blend=True
-#                                  blend=False # No apparent change
-        )
+        if irisMap is None:
+            irisMap = self.iris_texture(self.fname_iris,None,defer_loading)
+        self.irisMap = irisMap
+        if self.animationMap is not None:
+            scleraMap = self.animationMap
+        elif scleraMap is None:
+            scleraMap = self.sclera_texture(self.fname_sclera,None,defer_loading)
+        self.scleraMap = scleraMap
+        self.lidMap = texture_cache.get(self.cfg_db[eye_context]['lid.art'],
+                                        defer=defer_loading,
+                                        **LID_TEXTURE)
         # U/V map may be useful for debugging texture placement; not normally used
         #self.uvMap = pi3d.Texture(self.cfg_db[self.EYE_SELECT]['uv.art'], mipmap=False,
         #                          filter=pi3d.GL_LINEAR, blend=False, m_repeat=True)
 
+        if eye_context in ['hack'] and self.cfg_db['hack_prefetch']:
+            # Decode the next hack eye while this one is on screen
+            (fname_sclera,
+             fname_iris) = self.constrained_random_eye()
+            if self.animationMap is not None:
+                fname_sclera = None
+            pool = self.cfg_db['hack_texture_pool']
+            self.prefetch.start([(fname_sclera,
+                                  lambda fname, pixels: self.hack_texture('sclera',fname,pixels),
+                                  pool or not texture_cache.cached(fname_sclera, **SCLERA_TEXTURE)),
+                                 (fname_iris,
+                                  lambda fname, pixels: self.hack_texture('iris',fname,pixels),
+                                  pool or not texture_cache.cached(fname_iris, **IRIS_TEXTURE))])
+
         if eye_context is not None:
             self.eye_cache[eye_context]['irisMap'] = self.irisMap
             self.eye_cache[eye_context]['scleraMap'] = self.scleraMap
             self.eye_cache[eye_context]['lidMap'] = self.lidMap
             #self.eye_cache[eye_context]['uvMap'] = self.uvMap
 
-    def init_geometry_iris(self,eye_context=None):
+    # pixels: fname already decoded (numpy array), None: read the file
+    def iris_texture(self,fname,pixels=None,defer_loading=False):
+        return texture_cache.get(fname,pixels=pixels,defer=defer_loading,
+                                 **IRIS_TEXTURE)
+
+    def sclera_texture(self,fname,pixels=None,defer_loading=False):
+        return texture_cache.get(fname,pixels=pixels,defer=defer_loading,
+                                 **SCLERA_TEXTURE)
+
+    # Hack eye art (role 'iris' or 'sclera'): uploaded into the role's
+    # texture pool, or through the registry like the other art.  ETC1 art
+    # has no pixels to upload and always goes through the registry.
+    def hack_texture(self,role,fname,pixels=None):
+        textures = {'iris': self.iris_texture, 'sclera': self.sclera_texture}
+        if not self.cfg_db['hack_texture_pool']:
+            return textures[role](fname,pixels)
+        if pixels is None:
+            pixels = texture_cache.load_pixels(fname)
+        if pixels is None:
+            return textures[role](fname)
+        return hack_texture_pools[role].acquire(fname,pixels)
+
+    def init_geometry_iris(self,eye_context=None,baked=False):
         # Generate initial iris mesh; vertex elements will get replaced on
         # a per-frame basis in the main loop, this just sets up textures, etc.
         if self.cfg_db['eye_orientation'] in ['right']:        
-            self.iris = meshInit(32, 4, True, 0, 0.5/self.irisMap.iy, False)
+            self.iris = meshInit(32, 4, True, 0, 0.5/self.irisMap.iy, False,
+                                 self.uCoords.get('iris'))
         elif self.cfg_db['eye_orientation'] in ['left']:
-            self.iris = meshInit(32, 4, True, 0.5, 0.5/self.irisMap.iy, False)
+            self.iris = meshInit(32, 4, True, 0.5, 0.5/self.irisMap.iy, False,
+                                 self.uCoords.get('iris'))
         else:
             raise
             
         self.iris.set_textures([self.irisMap])
         self.iris.set_shader(self.shader)
         #self.iris.set_shader(shader_reflect)
-        self.irisZ = zangle(self.irisPts, self.eyeRadius)[0] * 0.99 # Get iris Z depth, for later
+        if not baked:
+            self.irisZ = zangle(self.irisPts, self.eyeRadius)[0] * 0.99 # Get iris Z depth, for later
+
+        if self.cfg_db['iris_shader']:
+            # Iris mesh at min and max pupil size; the mesh in between is
+            # linear in pupil scale, so frame() just hands that to the GPU
+            self.iris.set_blend_verts(
+                pointsMesh(None, self.pupilMinPts, self.irisPts, 4, -self.irisZ, True),
+                pointsMesh(None, self.pupilMaxPts, self.irisPts, 4, -self.irisZ, True),
+                np.zeros(len(self.iris.verts), dtype=np.float32))
+            self.iris.set_shader(shader_blend)
+            self.irisCache = None
+        else:
+            # Iris meshes for every pupil scale step the regen threshold can
+            # tell apart; frame() looks them up instead of regenerating
+            pupilMinPts = self.pupilMinPts
+            pupilMaxPts = self.pupilMaxPts
+            irisPts = self.irisPts
+            irisZ = self.irisZ
+            def irisBuilder(p, out):
+                return pointsMesh(None, pointsInterp(pupilMinPts, pupilMaxPts, p),
+                                  irisPts, 4, -irisZ, True, out=out)
+            self.irisCache = mesh_cache_t(irisBuilder,
+                                          self.irisRegenThreshold,
+                                          len(self.iris.verts),
+                                          max_bytes=self.cfg_db['iris_cache_max_bytes'],
+                                          lazy=self.cfg_db['iris_cache_lazy'])
 
         if eye_context is not None:
             self.eye_cache[eye_context]['iris'] = self.iris
             self.eye_cache[eye_context]['irisZ'] = self.irisZ
+            self.eye_cache[eye_context]['irisCache'] = self.irisCache
+            self.eye_cache[eye_context]['irisRegenThreshold'] = self.irisRegenThreshold
         
     def init_geometry_eyelids(self,eye_context=None):
         # Eyelid meshes are likewise temporary; texture coordinates are
         # assigned here but geometry is dynamically regenerated in main loop.
-        self.upperEyelid = meshInit(33, 5, False, 0, 0.5/self.lidMap.iy, True)
+        if self.cfg_db['eye_orientation'] in ['right']:
+            flip = True
+        elif self.cfg_db['eye_orientation'] in ['left']:
+            flip = False
+        else:
+            raise
+        # Flipped lids run their points backwards, so do their U coords
+        upperLidU = self.uCoords.get('upperLid')
+        lowerLidU = self.uCoords.get('lowerLid')
+        if flip and upperLidU is not None: upperLidU = 1.0 - upperLidU[::-1]
+        if flip and lowerLidU is not None: lowerLidU = 1.0 - lowerLidU[::-1]
+
+        self.upperEyelid = meshInit(33, 5, False, 0, 0.5/self.lidMap.iy, True, upperLidU)
         #self.upperEyelid = meshInit(40, 7, False, 0, 0.5/self.lidMap.iy, True)        
         self.upperEyelid.set_textures([self.lidMap])
         self.upperEyelid.set_shader(self.shader)
         #self.upperEyelid.set_shader(shader_reflect)
-        self.lowerEyelid = meshInit(33, 5, False, 0, 0.5/self.lidMap.iy, True)
+        self.lowerEyelid = meshInit(33, 5, False, 0, 0.5/self.lidMap.iy, True, lowerLidU)
         self.lowerEyelid.set_textures([self.lidMap])
         self.lowerEyelid.set_shader(self.shader)
         #self.lowerEyelid.set_shader(shader_reflect)
 
+        if self.cfg_db['lid_shader']:
+            # Open and closed lids both live in the mesh; frame() only sets
+            # the blend weights and the GPU does the rest
+            self.upperEyelid.set_blend_verts(*pointsBlendMesh(self.upperLidEdgePts,
+                                                              self.upperLidOpenPts,
+                                                              self.upperLidClosedPts,
+                                                              5, 0, False, flip))
+            self.upperEyelid.set_shader(shader_blend)
+            self.lowerEyelid.set_blend_verts(*pointsBlendMesh(self.lowerLidEdgePts,
+                                                              self.lowerLidOpenPts,
+                                                              self.lowerLidClosedPts,
+                                                              5, 0, False, flip))
+            self.lowerEyelid.set_shader(shader_blend)
+            self.upperLidTable = None
+            self.lowerLidTable = None
+        else:
+            # Every eyelid row the regen thresholds can tell apart, so blinks
+            # and tracking in frame() are table lookups instead of geometry math
+            self.upperLidTable = pointsTable(self.upperLidEdgePts,
+                                             self.upperLidOpenPts,
+                                             self.upperLidClosedPts,
+                                             self.upperLidRegenThreshold, 0, flip)
+            self.lowerLidTable = pointsTable(self.lowerLidEdgePts,
+                                             self.lowerLidOpenPts,
+                                             self.lowerLidClosedPts,
+                                             self.lowerLidRegenThreshold, 0, flip)
+
         if eye_context is not None:
             self.eye_cache[eye_context]['upperEyelid'] = self.upperEyelid
             self.eye_cache[eye_context]['lowerEyelid'] = self.lowerEyelid
-
-    def init_geometry_sclera(self,eye_context=None):
-        # Generate sclera for eye...start with a 2D shape for lathing...
-        angle1 = zangle(self.scleraFrontPts, self.eyeRadius)[1] # Sclera front angle
-        angle2 = zangle(self.scleraBackPts , self.eyeRadius)[1] # " back angle
-        aRange = 180 - angle1 - angle2
-        pts    = []
-        steps = 24
-        #steps = 12
-        for i in range(steps):
-            ca, sa = pi3d.Utility.from_polar((90 - angle1) - aRange * i / (steps-1))
-            pts.append((ca * self.eyeRadius, sa * self.eyeRadius))
-
-        #self.eye = pi3d.Lathe(path=pts, sides=16) # artifacts
-        #self.eye = pi3d.Lathe(path=pts, sides=32) 
-        #self.eye = pi3d.Lathe(path=pts, sides=64) # original
-        #self.eye = pi3d.Lathe(path=pts, sides=128)        
-        self.eye = pi3d.Lathe(path=pts, sides=256)
-        #self.eye = pi3d.Lathe(path=pts, sides=512)
-        #self.eye = pi3d.Lathe(path=pts, sides=1024)
-        #self.eye = pi3d.Lathe(path=pts, sides=2048)        
+            self.eye_cache[eye_context]['upperLidTable'] = self.upperLidTable
+            self.eye_cache[eye_context]['lowerLidTable'] = self.lowerLidTable
+            self.eye_cache[eye_context]['upperLidRegenThreshold'] = self.upperLidRegenThreshold
+            self.eye_cache[eye_context]['lowerLidRegenThreshold'] = self.lowerLidRegenThreshold
+
+    def sclera_lods(self):
+        # (sides, steps) per sclera detail level, finest first.  Sides
+        # follow the on-screen circumference so each side covers about
+        # SCLERA_PX_PER_SIDE pixels, rounded up to a multiple of 8; each
+        # coarser level halves that.  Rings keep the tuned steps/sides ratio.
+        # On HDMI level 0 stops at the tuned SCLERA_SIDES (more geometry
+        # shows no difference there), and every level stays within
+        # SCLERA_MAX_VERTICES.
+        radius = self.eyeRadius * DISPLAY_PROFILES[self.cfg_db['display_profile']]
+        lods = []
+        for level in range(max(1, self.cfg_db['sclera_lods'])):
+            max_sides = 2048
+            if self.cfg_db['display_profile'] in ['hdmi']:
+                max_sides = SCLERA_SIDES >> level
+            sides = 2.0 * math.pi * radius / (SCLERA_PX_PER_SIDE * (1 << level))
+            sides = min(max(int(math.ceil(sides / 8.0)) * 8, 16), max(max_sides, 16))
+            while True:
+                steps = max(int(round(SCLERA_STEPS * sides / float(SCLERA_SIDES))), 6)
+                if (sides + 1) * steps <= SCLERA_MAX_VERTICES or sides <= 16:
+                    break
+                sides -= 8
+            lods.append((sides, steps))
+        return lods
+
+    def set_sclera_lod(self,level):
+        # Switch the drawn sclera to another detail level, clamped to the
+        # levels built; applies to every eye context
+        self.scleraLod = min(max(level, 0), len(self.scleraLods) - 1)
+        self.eye = self.scleraLods[self.scleraLod]
         self.eye.set_textures([self.scleraMap])
-        self.eye.set_shader(self.shader)
-        #self.eye.set_shader(shader_reflect)
+        print ('sclera lod {}: {} vertices'.format(
+            self.scleraLod, len(self.eye.buf[0].array_buffer)))
+
+    def sclera_tex_offset(self):
+        # U offset lathed into the sclera texture coordinates
+        if self.cfg_db['sclera_atlas'] is not None:
+            return 0.0 # Rolled into the atlas frames instead
         if self.cfg_db['eye_orientation'] in ['right']:
-            reAxis(self.eye, 0.0)
+            return 0.0
         elif self.cfg_db['eye_orientation'] in ['left']:
-            reAxis(self.eye, 0.5)
+            return 0.5
         else:
             raise
 
+    def init_geometry_sclera(self,eye_context=None,baked=False):
+        # Generate sclera for eye...start with a 2D shape for lathing...
+        angle1 = zangle(self.scleraFrontPts, self.eyeRadius)[1] # Sclera front angle
+        angle2 = zangle(self.scleraBackPts , self.eyeRadius)[1] # " back angle
+        aRange = 180 - angle1 - angle2
+        texOffset = self.sclera_tex_offset()
+
+        global sclera_cache
+        self.scleraLods = []
+        for (level, (sides, steps)) in enumerate(self.sclera_lods()):
+            key = (angle1, angle2, self.eyeRadius, sides, steps, texOffset)
+            if key in sclera_cache:
+                shape = sclera_cache[key]
+            elif baked:
+                # Lathed by an earlier run
+                shape = buffer_shape_t(*self.scleraBufs[level])
+            else:
+                pts = []
+                for i in range(steps):
+                    ca, sa = pi3d.Utility.from_polar((90 - angle1) - aRange * i / (steps-1))
+                    pts.append((ca * self.eyeRadius, sa * self.eyeRadius))
+                # Same as pi3d.Lathe(path=pts, sides=sides) then reAxis(texOffset)
+                shape = latheZ(pts, sides, texOffset)
+            sclera_cache[key] = shape
+            shape.set_textures([self.scleraMap])
+            if self.cfg_db['sclera_animation']:
+                shape.set_shader(shader_hue)
+            else:
+                shape.set_shader(self.shader)
+            #shape.set_shader(shader_reflect)
+            self.scleraLods.append(shape)
+        self.eye = self.scleraLods[min(self.scleraLod, len(self.scleraLods) - 1)]
+
         if eye_context is not None:
-            self.eye_cache[eye_context]['eye'] = self.eye
+            self.eye_cache[eye_context]['scleraLods'] = self.scleraLods
 
         
-    def init_geometry(self,eye_context=None):
+    def init_geometry(self,eye_context=None,baked=False):
         # Initialize static geometry -----------------------------------------------
 
+        if not baked:
+            self.scale_geometry()
+
+        self.init_geometry_iris(eye_context,baked)
+        self.init_geometry_eyelids(eye_context)
+        self.init_geometry_sclera(eye_context,baked)
+
+        if not baked:
+            self.save_geometry(eye_context)
+
+    def scale_geometry(self):
         # Transform point lists to eye dimensions
         offset_x = 0.0
         offset_y = 0.0
@@ -858,7 +1222,7 @@ class gecko_eye_t(object):
         # roughly equal to 1/2 pixel, since 2x2 area sampling is used.
 
         # Determine change in pupil size to trigger iris geometry regen
-        irisRegenThreshold = 0.0
+        self.irisRegenThreshold = 0.0
         a = pointsBounds(self.pupilMinPts) # Bounds of pupil at min size (in pixels)
         b = pointsBounds(self.pupilMaxPts) # " at max size
         maxDist = max(abs(a[0] - b[0]), abs(a[1] - b[1]), # Determine distance of max
@@ -886,10 +1250,6 @@ class gecko_eye_t(object):
         d  = dx * dx + dy * dy
         if d > 0: self.lowerLidRegenThreshold = 0.5 / math.sqrt(d)
 
-        self.init_geometry_iris(eye_context)
-        self.init_geometry_eyelids(eye_context)
-        self.init_geometry_sclera(eye_context)
-
         
     def init_globals(self):
         # Init global stuff --------------------------------------------------------
@@ -909,7 +1269,9 @@ class gecko_eye_t(object):
         self.isMoving     = False
 
         self.frame_cnt        = 0
-        self.beginningTime = time.time()
+        self.beginningTime = monotonic()
+        self.render_sec = self.beginningTime
+        self.run_start_time = self.beginningTime
 
         self.eye.positionX(0.0)
         self.iris.positionX(0.0)
@@ -919,11 +1281,12 @@ class gecko_eye_t(object):
         self.lowerEyelid.positionZ(-self.eyeRadius - 42)
 
         self.currentPupilScale  =  0.5
+        self.pupil = pupil_trajectory_t(self.cfg_db['pupil_min'],
+                                        self.cfg_db['pupil_max'],
+                                        value=self.currentPupilScale)
         self.prevPupilScale     = -1.0 # Force regen on first frame
         self.prevUpperLidWeight = 0.5
         self.prevLowerLidWeight = 0.5
-        self.prevUpperLidPts    = pointsInterp(self.upperLidOpenPts, self.upperLidClosedPts, 0.5)
-        self.prevLowerLidPts    = pointsInterp(self.lowerLidOpenPts, self.lowerLidClosedPts, 0.5)
         
         self.ruRegen = True
         self.rlRegen = True
@@ -941,6 +1304,17 @@ class gecko_eye_t(object):
         
         self.trackingPos = 0.3        
 
+        # Fixed timestep simulation; frames draw between the last two states
+        self.stepper = fixed_step_t(self.cfg_db['sim_rate_hz'])
+        self.sim_prev = None
+        self.sim_state = None
+
+        # Unchanged frames are not redrawn (see frame())
+        self.drawn_state = None
+        self.frame_redrawn = False
+        self.frames_drawn = 0
+        self.frames_skipped = 0
+
         self.update_eye_events(reset=True)
         test_time = self.cfg_db['move_scripted_duration_joystick_sec']
         self.test_eye_events = [('eye_right',test_time),
@@ -952,84 +1326,104 @@ class gecko_eye_t(object):
                                 ('eye_down',test_time),
                                 ('eye_southeast',test_time)]
         
-    def split(self, # Recursive simulated pupil response when no analog sensor
-              startValue, # Pupil scale starting value (0.0 to 1.0)
-              endValue,   # Pupil scale ending value (")
-              duration,   # Start-to-end time, floating-point seconds
-              range):     # +/- random pupil scale at midpoint
-        
-        do_exit = False
-	startTime = time.time()
-	if range >= 0.125: # Limit subdvision count, because recursion
-	    duration *= 0.5 # Split time & range in half for subdivision,
-	    range    *= 0.5 # then pick random center point within range:
-	    midValue  = ((startValue + endValue - range) * 0.5 +
-		         random.uniform(0.0, range))
-	    do_exit |= self.split(startValue, midValue, duration, range)
-            if not do_exit:
-		do_exit |= self.split(midValue  , endValue, duration, range)
-            self.init_keyboard()
-	else: # No more subdivisons, do iris motion...
-	    dv = endValue - startValue
-	    while not do_exit:
-                now_sec = time.time()
-		dt = now_sec - startTime
-		if dt >= duration: break
-                if self.pupil_event_queued: break
-                if self.eye_context_next is not None: break                        
-		v = startValue + dv * dt / duration
-		if   v < self.cfg_db['pupil_min']: v = self.cfg_db['pupil_min']
-		elif v > self.cfg_db['pupil_max']: v = self.cfg_db['pupil_max']
-		self.frame(v) # Draw frame w/interim pupil scale value
-                self.do_wearables()
-                self.do_eye_comm()                        
-                self.do_joystick()
-                do_exit |= self.keyboard_sample()
-                    
-                if (self.cfg_db['demo'] or self.cfg_db['playa']) and \
-                   int(now_sec - self.last_eye_art_sec) > self.cfg_db['demo_eye_tenure_secs']:
-                    self.last_eye_art_sec = now_sec
-                    next_eye = self.random_next_eye()
-                    if self.cfg_db['switch_on_blink']:
-                        if not self.eye_switch_pending:
-                            self.eye_switch_pending = True
-                            self.eye_switch_next = next_eye
-                    else:
-                        self.EYE_SELECT = self.switch_eye_context(next_eye)
+    # Next pupil move: (target scale, duration) by priority, joystick
+    # first, then the emotion or autonomous fractal response
+    def pupil_target(self):
+        if self.pupil_event_queued:  # Joystick control of pupil
+            self.pupil_event_queued = False
+            self.eye_event_prev = self.event_pupil
+            if self.event_pupil in ['pupil_widen']:
+                v = 1.0
+            elif self.event_pupil in ['pupil_narrow']:
+                v = 0.0
+            else:
+                raise
+            duration = 0.25
+        else:
+            emotion_selected = self.emotion_select()
+            emotion_selected = None
+            if emotion_selected is not None:
+                (v,duration) = emotion_selected()
+                if v is None:
+                    v = self.last_v
+                    duration = 0.0
+                self.last_v = v
+            else: # Autonomous mode
+                v = self.last_v
+                #duration = 0.1
+                #v = random.random()
+                duration = self.cfg_db['pupil_auto_expand_sec']
+        return (v,duration)
+
+    # Input and housekeeping done once per frame; True to exit.  One
+    # poll of all the input sources, then only those with input are read.
+    def poll_inputs(self,now_sec):
+        ready = self.inputs.poll()
+        if 'wearables' in ready:
+            self.do_wearables()
+        if 'eye_comm' in ready:
+            self.do_eye_comm()
+        self.do_joystick('joystick' in ready)
+        do_exit = self.keyboard_sample('keyboard' in ready)
+
+        if (self.cfg_db['demo'] or self.cfg_db['playa']) and \
+           int(now_sec - self.last_eye_art_sec) > self.cfg_db['demo_eye_tenure_secs']:
+            self.last_eye_art_sec = now_sec
+            next_eye = self.random_next_eye()
+            if self.cfg_db['switch_on_blink']:
+                if not self.eye_switch_pending:
+                    self.eye_switch_pending = True
+                    self.eye_switch_next = next_eye
+            else:
+                self.EYE_SELECT = self.switch_eye_context(next_eye)
 
         return do_exit
 
-    def draw_eye(self):
+    def draw_eye(self,x=None,y=None):
+        if x is None:
+            (x, y) = (self.curX, self.curY)
 	#convergence = 2.0
         convergence = 0.0        
         if self.cfg_db['eye_orientation'] in ['right']:
-	    self.iris.rotateToX(self.curY)
-	    self.iris.rotateToY(self.curX - convergence)
+	    self.iris.rotateToX(y)
+	    self.iris.rotateToY(x - convergence)
 	    self.iris.draw()
-	    self.eye.rotateToX(self.curY - convergence)
-	    self.eye.rotateToY(self.curX)
+	    self.eye.rotateToX(y - convergence)
+	    self.eye.rotateToY(x)
         elif self.cfg_db['eye_orientation'] in ['left']:
-	    self.iris.rotateToX(self.curY)
-	    self.iris.rotateToY(self.curX + convergence)
+	    self.iris.rotateToX(y)
+	    self.iris.rotateToY(x + convergence)
 	    self.iris.draw()
-	    self.eye.rotateToX(self.curY)
-	    self.eye.rotateToY(self.curX + convergence)
+	    self.eye.rotateToX(y)
+	    self.eye.rotateToY(x + convergence)
         else:
             raise
 
 
-        if False:
-            anim_texture = self.animations[self.animation_frame]
-            self.animation_frame += 1
-            self.animation_frame %= len(self.animations)
-            self.eye.set_textures([anim_texture])
-            #self.eye.set_textures(self.animations)
-            #self.eye.set_offset(self.animation_frame)
+        if self.cfg_db['sclera_animation']:
+            # Hue angle from elapsed time so the cycle rate is independent of fps
+            turns = ((self.render_sec - self.animationStart) *
+                     self.cfg_db['sclera_animation_deg_per_sec'] / 360.0) % 1.0
+            self.eye.set_custom_data(48, [2.0 * math.pi * turns, 0.0, 0.0])
+        if self.cfg_db['sclera_atlas'] is not None:
+            self.set_atlas_frame(self.eye)
         
 	self.eye.draw()
         self.upperEyelid.draw()
         self.lowerEyelid.draw()
 
+    def set_atlas_frame(self,shape):
+        # Frame from elapsed time; only a page change rebinds a texture
+        frame = int((self.render_sec - self.animationStart) *
+                    self.cfg_db['sclera_atlas_fps']) % len(self.animationRects)
+        (page, u, v, umult, vmult) = self.animationRects[frame]
+        texture = self.animationPages[page]
+        if shape.buf[0].textures[0] is not texture:
+            shape.set_textures([texture])
+        for b in shape.buf:
+            b.unib[6:8] = (umult, vmult)
+            b.unib[9:11] = (u, v)
+
     def check_same_event(self,prev_event,event):
         prev_event_opt = None
         event_opt = None
@@ -1104,14 +1498,18 @@ class gecko_eye_t(object):
         
         return events_opt
 
-    # Generate one frame of imagery
-    def frame(self,p):
-	self.DISPLAY.loop_running()
-
-	now_sec = time.time()
-	dt  = now_sec - self.move_startTime
+    # Generate one frame of imagery: the eye state advances to now_sec in
+    # fixed steps, and the frame draws it interpolated between the last two
+    def frame(self,p,now_sec=None):
+        if now_sec is None:
+            now_sec = monotonic()
+        self.render_sec = now_sec
 
 	self.frame_cnt += 1
+        if self.cfg_db['hack_prefetch'] > 1:
+            # Upload the next hack eye as soon as it is decoded, so the
+            # switch itself does no texture work
+            self.prefetch.upload()
         if (self.frame_cnt % 1000) == 0:
             frame_rate = float(self.frame_cnt) / float(now_sec - self.run_start_time)
             if False:
@@ -1120,6 +1518,56 @@ class gecko_eye_t(object):
 #	if(now_sec > beginningTime):
 #		print(frames/(now_sec-beginningTime))
 
+        for step_sec in self.stepper.advance(now_sec):
+            self.step(step_sec)
+            state = (self.curX, self.curY,
+                     self.newUpperLidWeight, self.newLowerLidWeight)
+            self.sim_prev = state if self.sim_state is None else self.sim_state
+            self.sim_state = state
+        a = self.stepper.alpha(now_sec)
+        (x, y, upper, lower) = [s0 + (s1 - s0) * a for (s0, s1) in
+                                zip(self.sim_prev, self.sim_state)]
+
+        if self.cfg_db['skip_unchanged']:
+            # Nothing moved: leave the last frame on screen (fbx2 keeps
+            # copying it), no draw and no swap.  A frame that stops
+            # changing is drawn once more so that both buffers hold it.
+            changed = self.frame_changed(p, x, y, upper, lower)
+            if not changed and self.frame_redrawn:
+                self.frames_skipped += 1
+                return
+            self.frame_redrawn = not changed
+
+        self.DISPLAY.loop_running()
+        self.frames_drawn += 1
+        self.render(p, x, y, upper, lower)
+
+    # Whether the frame differs from the last one drawn: gaze, pupil or
+    # lids moved by 1/2 pixel or more (measured from the last drawn
+    # values, so slow drifts add up), other shapes or art are bound, or
+    # the sclera is animated
+    def frame_changed(self,p,x,y,upper,lower):
+        bound = (self.iris, self.eye, self.upperEyelid, self.lowerEyelid,
+                 tuple(self.iris.buf[0].textures), tuple(self.eye.buf[0].textures),
+                 sum(pool.uploads for pool in hack_texture_pools.values()))
+        drawn = self.drawn_state
+        changed = drawn is None or \
+            self.cfg_db['sclera_animation'] or \
+            self.cfg_db['sclera_atlas'] is not None or \
+            bound != drawn[5] or \
+            abs(p - drawn[0]) >= self.irisRegenThreshold or \
+            abs(x - drawn[1]) >= self.gazeRedrawThreshold or \
+            abs(y - drawn[2]) >= self.gazeRedrawThreshold or \
+            abs(upper - drawn[3]) >= self.upperLidRegenThreshold or \
+            abs(lower - drawn[4]) >= self.lowerLidRegenThreshold
+        if changed:
+            self.drawn_state = (p, x, y, upper, lower, bound)
+        return changed
+
+    # One fixed step of the eye state: gaze, blinks and lid tracking
+    def step(self,now_sec):
+	dt  = now_sec - self.move_startTime
+
 	if self.cfg_db['JOYSTICK_X_IN'] >= 0 and self.cfg_db['JOYSTICK_Y_IN'] >= 0:
             raise
             # Eye position from analog inputs
@@ -1151,8 +1599,9 @@ class gecko_eye_t(object):
                     self.move_startTime    = now_sec
                     self.isMoving     = False                    
             elif self.eye_event_queued() and \
-               now_sec >= (self.time_last_joystick_service + \
-                          self.cfg_db['joystick_service_interval_sec']):
+               (self.time_last_joystick_service is None or \
+                now_sec >= (self.time_last_joystick_service + \
+                            self.cfg_db['joystick_service_interval_sec'])):
                # Joystick control has next priority
                 self.time_last_joystick_service = now_sec
                 self.eye_event_prev = self.eye_event
@@ -1252,12 +1701,15 @@ class gecko_eye_t(object):
             else:
                 auto_eye = False
                 if self.joystick is None:
-                    if now_sec >= self.cfg_db['auto_restart_interval_sec'] + \
+                    if self.last_eye_comm_recv is None or \
+                       now_sec >= self.cfg_db['auto_restart_interval_sec'] + \
                        self.last_eye_comm_recv:
                         auto_eye = True
                 else: # joystick is attached
-                    if now_sec >= self.cfg_db['auto_restart_joystick_interval_sec'] + \
-                       self.joystick.get_last_joystick_time():
+                    last_joystick_sec = self.joystick.get_last_joystick_time()
+                    if last_joystick_sec is None or \
+                       now_sec >= self.cfg_db['auto_restart_joystick_interval_sec'] + \
+                       last_joystick_sec:
                         # resume auto-eye animation if joystick has been idle
                         auto_eye = True
 
@@ -1278,15 +1730,6 @@ class gecko_eye_t(object):
                         self.move_startTime = now_sec
                         self.isMoving = True
 
-	# Regenerate iris geometry only if size changed by >= 1/2 pixel
-	if abs(p - self.prevPupilScale) >= self.irisRegenThreshold:
-		# Interpolate points between min and max pupil sizes
-		interPupil = pointsInterp(self.pupilMinPts, self.pupilMaxPts, p)
-		# Generate mesh between interpolated pupil and iris bounds
-		mesh = pointsMesh(None, interPupil, self.irisPts, 4, -self.irisZ, True)
-		self.iris.re_init(pts=mesh)
-		self.prevPupilScale = p
-
 	# Eyelid WIP
 
 	if self.event_doBlink or \
@@ -1364,74 +1807,71 @@ class gecko_eye_t(object):
         self.newUpperLidWeight = self.trackingPos + (n * (1.0 - self.trackingPos))
 	self.newLowerLidWeight = (1.0 - self.trackingPos) + (n * self.trackingPos)
 
-        if self.cfg_db['eye_orientation'] in ['right']:                
-            flip = True
-        elif self.cfg_db['eye_orientation'] in ['left']:            
-            flip = False
-        else:
-            raise
-        
-	if (self.ruRegen or \
-            (abs(self.newUpperLidWeight - self.prevUpperLidWeight) >= \
+    # Draw the eye with the given pupil scale, gaze and lid weights
+    def render(self,p,x,y,upper,lower):
+        if self.cfg_db['iris_shader']:
+            # Pupil size is blended on the GPU
+            self.iris.set_blend(p, p)
+	# Regenerate iris geometry only if size changed by >= 1/2 pixel
+	elif abs(p - self.prevPupilScale) >= self.irisRegenThreshold:
+		# Cached mesh between interpolated pupil and iris bounds
+		self.iris.update_pts(self.irisCache.get(p))
+		self.prevPupilScale = p
+
+        if self.cfg_db['lid_shader']:
+            # Lid shapes are blended on the GPU, from last frame's weights
+            # to this frame's, as the regenerated meshes below run
+            self.upperEyelid.set_blend(self.prevUpperLidWeight, upper)
+            self.lowerEyelid.set_blend(self.prevLowerLidWeight, lower)
+            self.prevUpperLidWeight = upper
+            self.prevLowerLidWeight = lower
+	elif (self.ruRegen or \
+            (abs(upper - self.prevUpperLidWeight) >= \
              self.upperLidRegenThreshold)):
-            self.newUpperLidPts = pointsInterp(self.upperLidOpenPts,
-                                               self.upperLidClosedPts,
-                                               self.newUpperLidWeight)
-            if self.newUpperLidWeight > self.prevUpperLidWeight:
-                self.upperEyelid.re_init(
-                    pts=pointsMesh(
-                    self.upperLidEdgePts,
-                    self.prevUpperLidPts,
-                    self.newUpperLidPts, 5, 0, False, flip))
-            else:
-                self.upperEyelid.re_init(
-                    pts=pointsMesh(
-                    self.upperLidEdgePts,
-                    self.newUpperLidPts,
-                    self.prevUpperLidPts, 5, 0, False, flip))
-            self.prevUpperLidWeight = self.newUpperLidWeight
-            self.prevUpperLidPts    = self.newUpperLidPts
+            self.upperEyelid.update_pts(
+                pointsTableMesh(
+                self.upperLidTable,
+                self.prevUpperLidWeight,
+                upper, 5,
+                out=self.upperEyelid.verts))
+            self.prevUpperLidWeight = upper
             self.ruRegen = True
 	else:
             self.ruRegen = False
 
-	if (self.rlRegen or \
-            (abs(self.newLowerLidWeight - self.prevLowerLidWeight) >= \
+	if (not self.cfg_db['lid_shader']) and \
+           (self.rlRegen or \
+            (abs(lower - self.prevLowerLidWeight) >= \
              self.lowerLidRegenThreshold)):
-            self.newLowerLidPts = pointsInterp(self.lowerLidOpenPts,
-                                               self.lowerLidClosedPts,
-                                               self.newLowerLidWeight)
-            if self.newLowerLidWeight > self.prevLowerLidWeight:
-                self.lowerEyelid.re_init(
-                    pts=pointsMesh(
-                    self.lowerLidEdgePts,
-                    self.prevLowerLidPts,
-                    self.newLowerLidPts, 5, 0, False, flip))
-            else:
-                self.lowerEyelid.re_init(
-                    pts=pointsMesh(
-                    self.lowerLidEdgePts,
-                    self.newLowerLidPts,
-                    self.prevLowerLidPts, 5, 0, False, flip))
-            self.prevLowerLidWeight = self.newLowerLidWeight
-            self.prevLowerLidPts    = self.newLowerLidPts
+            self.lowerEyelid.update_pts(
+                pointsTableMesh(
+                self.lowerLidTable,
+                self.prevLowerLidWeight,
+                lower, 5,
+                out=self.lowerEyelid.verts))
+            self.prevLowerLidWeight = lower
             self.rlRegen = True
 	else:
             self.rlRegen = False
 
 	# Draw eye
-        self.draw_eye()
+        self.draw_eye(x,y)
 
-    def keyboard_sample(self):
+    # ready: whether the keyboard has input, None to check
+    def keyboard_sample(self,ready=None):
         self.init_keyboard()
         if self.keyboard is not None:
-            events = self.keyboard.sample()
+            events = self.keyboard.sample(ready)
             for event in events:
                 print ('event: {}'.format(event))
                 if event.type == ecodes.EV_KEY:
                     print ('keyboard event: {}'.format(event))
                     if event.code == 1 and event.value == 1: # Escape key
                         return True
+                    elif event.code == ecodes.KEY_LEFTBRACE and event.value == 1:
+                        self.set_sclera_lod(self.scleraLod + 1) # Coarser sclera
+                    elif event.code == ecodes.KEY_RIGHTBRACE and event.value == 1:
+                        self.set_sclera_lod(self.scleraLod - 1) # Finer sclera
                 elif True: # other keys here
                     pass
                 else:
@@ -1465,7 +1905,7 @@ class gecko_eye_t(object):
         if len(events) == 0:
             return
 
-        now_sec = time.time()        
+        now_sec = monotonic()        
         for event in events:
             if False:
                 print ('handle_event: {}'.format(event))
@@ -1578,7 +2018,7 @@ class gecko_eye_t(object):
     def do_eye_comm(self):
         msgs = self.eye_client.get_msgs_nonblocking()
         if msgs is not None:
-            self.last_eye_comm_recv = time.time()
+            self.last_eye_comm_recv = monotonic()
             gecko_events = [msg_rec['effect'] for msg_rec in msgs]
             if self.debug:
                 print ('eye_comm: recv {}'.format(gecko_events))
@@ -1595,19 +2035,19 @@ class gecko_eye_t(object):
     def create_joystick_test_msg(self):
         #eye_event = random.choice(self.test_eye_events)
         eye_event = self.test_eye_events[self.test_joystick_cnt % len(self.test_eye_events)]
-        now = time.time()
-        dt = now - self.debug_joystick_sec
-        if dt > 1:
+        now = monotonic()
+        if self.debug_joystick_sec is None or now - self.debug_joystick_sec > 1:
             self.eye_server.send_msg(eye_event)
             self.debug_joystick_sec = now
             self.test_joystick_cnt += 1
         
-    def do_joystick(self):
+    # ready: whether the joystick has input, None to read it anyway
+    def do_joystick(self,ready=None):
         self.init_joystick()
         gecko_events = []
         if self.cfg_db['joystick_test']:
             gecko_events = self.create_joystick_test_msg()
-        elif self.joystick is not None:
+        elif self.joystick is not None and ready is not False:
             #print ('DO_JOYSTICK')
             gecko_events = self.joystick.sample_nonblocking()
             self.handle_events(gecko_events)
@@ -1696,11 +2136,18 @@ class gecko_eye_t(object):
             
         print ('eye_orientation: {}'.format(self.cfg_db['eye_orientation']))
 
-        now_time = time.time()
+        self.pacer = frame_pacer_t(self.cfg_db['frame_rate'])
+        print ('frame rate limit: {}'.format(self.cfg_db['frame_rate'] or 'none'))
+
+        now_time = monotonic()
         self.run_start_time = now_time
         self.watchdog_sec = now_time
         self.last_eye_art_sec = now_time
         while not do_exit:
+            # One clock sample per frame, shared by the pupil, the eye
+            # simulation and input handling, taken once the pacer says
+            # the frame is due
+            now_sec = self.pacer.wait()
             if self.cfg_db['PUPIL_IN'] >= 0: # Pupil scale from sensor
                 raise
 		v = adcValue[self.cfg_db['PUPIL_IN']]
@@ -1715,43 +2162,23 @@ class gecko_eye_t(object):
 		if self.cfg_db['PUPIL_SMOOTH'] > 0:
 			v = ((currentPupilScale * (self.cfg_db['PUPIL_SMOOTH'] - 1) + v) /
 			     self.cfg_db['PUPIL_SMOOTH'])
-                self.frame(v)
+                self.frame(v,now_sec)
+                self.currentPupilScale = v
             else: # Fractal auto pupil scale
-                # Priority mux
                 if self.eye_context_next is not None: # Transition to new eye
                     break
-                
-                elif self.pupil_event_queued:  # Joystick control of pupil
-                    self.pupil_event_queued = False
-                    self.eye_event_prev = self.event_pupil
-                    if self.event_pupil in ['pupil_widen']:
-                        v = 1.0
-                    elif self.event_pupil in ['pupil_narrow']:
-                        v = 0.0
-                    else:
-                        raise
-                    duration = 0.25
-                else:
-                    emotion_selected = self.emotion_select()
-                    emotion_selected = None
-                    if emotion_selected is not None:
-                        (v,duration) = emotion_selected()
-                        if v is None:
-                            v = self.last_v
-                            duration = 0.0
-                        self.last_v = v
-                    else: # Autonomous mode
-                        v = self.last_v
-                        #duration = 0.1
-                        #v = random.random()
-                        duration = self.cfg_db['pupil_auto_expand_sec']
-                do_exit |= self.split(self.currentPupilScale, v, duration, 1.0)
-                #leak_check()                
-                
 
-            self.currentPupilScale = v
-            #do_exit = self.keyboard_sample()
-            now_sec = time.time()
+                # A joystick pupil event cuts the current move short and
+                # the next one starts from where the pupil is now
+                if self.pupil_event_queued or self.pupil.done(now_sec):
+                    self.currentPupilScale = self.pupil.value(now_sec)
+                    (v,duration) = self.pupil_target()
+                    self.pupil.start(now_sec, self.currentPupilScale, v, duration)
+                    #leak_check()
+
+                self.frame(self.pupil.scale(now_sec),now_sec) # Draw frame w/interim pupil scale value
+                do_exit |= self.poll_inputs(now_sec)
+
             if self.cfg_db['timeout_secs'] is not None and \
                int(now_sec - self.watchdog_sec) > self.cfg_db['timeout_secs']:
                 do_exit |= True
@@ -1768,6 +2195,19 @@ class gecko_eye_t(object):
         return self.eye_context_next
 
     def shutdown(self):
+        print ('frame pacer: {}'.format(self.pacer.stats()))
+        print ('input mux: {}'.format(self.inputs.stats()))
+        frames = self.frames_drawn + self.frames_skipped
+        if frames > 0:
+            print ('frames: {} drawn, {} skipped unchanged ({:.0f}%)'.format(
+                self.frames_drawn, self.frames_skipped,
+                100.0 * self.frames_skipped / frames))
+        print ('texture cache: {}'.format(texture_cache.stats()))
+        if texture_cache.raw is not None:
+            print ('raw cache: {} hits, {} misses'.format(texture_cache.raw.hits,
+                                                          texture_cache.raw.misses))
+        for role in sorted(hack_texture_pools):
+            print ('{} texture pool: {}'.format(role, hack_texture_pools[role].stats()))
         #del self.light
         #del self.cam
         #del self.shader
@@ -1803,7 +2243,7 @@ class gecko_eye_t(object):
         self.fsm_angry = None
         
     def emotion_select(self):
-        now_sec = time.time()
+        now_sec = monotonic()
         if now_sec < self.nxt_emotion_sec:
             return None
 
@@ -1925,14 +2365,14 @@ class gecko_eye_t(object):
         
 if __name__ == "__main__":
     eye_context = None
-    time_first_sec = time.time()    
+    time_first_sec = monotonic()    
     timeout = False
     while True and not timeout:
         leak_check()
         gecko_eye = gecko_eye_t(EYE_SELECT=eye_context)
         eye_context = gecko_eye.run()
         if gecko_eye.cfg_db['timeout_secs'] is not None:
-            now_sec = time.time()
+            now_sec = monotonic()
             if now_sec > time_first_sec + gecko_eye.cfg_db['timeout_secs']:
                 timeout = True
             
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+
+import os
+import json
+import struct
+import hashlib
+import numpy as np
+
+# Baked eye geometry on disk: a set of named numpy arrays plus a few
+# scalars in one file, memory-mapped on load so a warm start costs a
+# file open instead of SVG parsing, path sampling and lathing.
+#
+# File layout:
+#   magic (4 bytes) | header length (uint32, little endian) | JSON header
+#   | padding to GEOM_ALIGN | array data
+# The JSON header holds the scalars and, per array, its dtype, shape and
+# byte offset from the start of the (aligned) data block.
+GEOM_MAGIC = b'GEO1'
+GEOM_ALIGN = 16
+
+def geom_align(n):
+    return (n + GEOM_ALIGN - 1) // GEOM_ALIGN * GEOM_ALIGN
+
+class geom_cache_t(object):
+    def __init__(self,cache_dir='cache/geometry',debug=False):
+        self.debug = debug
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+
+    # Cache key: the SVG file contents plus whatever else the baked
+    # geometry depends on (radius, point counts, orientation, ...)
+    def key(self,fname_svg,*params):
+        h = hashlib.sha1()
+        with open(fname_svg,'rb') as f:
+            h.update(f.read())
+        h.update(repr(params).encode('utf-8'))
+        return h.hexdigest()
+
+    def path(self,key):
+        return os.path.join(self.cache_dir,'{}.geom'.format(key))
+
+    # Returns (arrays, scalars) or None on a miss.  Arrays are read-only
+    # views into the memory-mapped file.
+    def load(self,key):
+        if self.cache_dir is None:
+            return None
+
+        fname = self.path(key)
+        if not os.path.exists(fname):
+            self.misses += 1
+            return None
+
+        try:
+            mm = np.memmap(fname, dtype=np.uint8, mode='r')
+            if mm[0:4].tobytes() != GEOM_MAGIC:
+                raise ValueError('bad magic')
+            (hlen,) = struct.unpack('<I', mm[4:8].tobytes())
+            header = json.loads(mm[8:8+hlen].tobytes().decode('utf-8'))
+            base = geom_align(8 + hlen)
+            arrays = {}
+            for name,(dtype,shape,offset) in header['arrays'].items():
+                dt = np.dtype(str(dtype))
+                start = base + offset
+                end = start + int(np.prod(shape)) * dt.itemsize
+                if end > start and end > len(mm):
+                    raise ValueError('truncated')
+                arrays[str(name)] = mm[start:end].view(dt).reshape(shape)
+        except (ValueError, KeyError, TypeError, struct.error) as e:
+            print ('geometry cache: ignoring {}: {}'.format(fname,e))
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        if self.debug:
+            print ('geometry cache: loaded {}'.format(fname))
+        return (arrays, header['scalars'])
+
+    def save(self,key,arrays,scalars):
+        if self.cache_dir is None:
+            return
+
+        index = {}
+        data = []
+        offset = 0
+        for name in sorted(arrays):
+            a = np.ascontiguousarray(arrays[name])
+            index[name] = (a.dtype.str, list(a.shape), offset)
+            data.append((offset, a))
+            offset = geom_align(offset + a.nbytes)
+        header = json.dumps({'arrays': index,
+                             'scalars': scalars}).encode('utf-8')
+        base = geom_align(8 + len(header))
+
+        fname = self.path(key)
+        tmp = '{}.{}.tmp'.format(fname, os.getpid())
+        try:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            with open(tmp,'wb') as f:
+                f.write(GEOM_MAGIC)
+                f.write(struct.pack('<I', len(header)))
+                f.write(header)
+                for (offset, a) in data:
+                    f.seek(base + offset)
+                    f.write(a.tobytes())
+            # Readers never see a partially written file
+            os.rename(tmp, fname)
+        except (IOError, OSError) as e:
+            print ('geometry cache: cannot write {}: {}'.format(fname,e))
+            return
+
+        if self.debug:
+            print ('geometry cache: saved {}'.format(fname))
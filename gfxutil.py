@@ -1,9 +1,59 @@
 import pi3d
 import math
+import ctypes
+import numpy as np
+from pi3d.constants import opengles, GL_ARRAY_BUFFER, GLfloat, GLintptr, GLsizeiptr
 from svg.path import Path, parse_path
+from xml.dom.minidom import parse
+try:
+	import xml.etree.cElementTree as ElementTree
+except ImportError:
+	import xml.etree.ElementTree as ElementTree
+
+# The SVG getters below take either a minidom tree (walked on every call)
+# or an svg_index_t, which walks the file once and answers from a table.
+# Elements are visited children-first, same as the recursive getters, and
+# the first match wins, so both give the same answer for any document.
+class svg_index_t(object):
+	def __init__(self, fname, streaming=True):
+		self.viewBox = None
+		self.paths   = {} # id -> path 'd' attribute
+		self.parsed  = {} # id -> parsed Path, filled on first use
+		if streaming:
+			# Post-order 'end' events, no DOM kept around
+			for event, elem in ElementTree.iterparse(fname, events=('end',)):
+				self.add(elem.tag.rsplit('}', 1)[-1],
+				  lambda name: elem.get(name, ""))
+				elem.clear()
+		else:
+			self.walk(parse(fname))
+
+	def walk(self, root):
+		for node in root.childNodes:
+			if node.nodeType == node.ELEMENT_NODE:
+				self.walk(node)
+				self.add(node.tagName, node.getAttribute)
+
+	def add(self, tag, getAttribute):
+		tag = tag.lower()
+		if tag == "path":
+			id = getAttribute("id")
+			if id: self.paths.setdefault(id, getAttribute("d"))
+		elif tag == "svg" and self.viewBox is None:
+			vb = getAttribute("viewBox").split()
+			self.viewBox = (float(vb[0]), float(vb[1]),
+			                float(vb[2]), float(vb[3]))
+
+	def path(self, id):
+		if id not in self.parsed:
+			if id not in self.paths: return None
+			self.parsed[id] = parse_path(self.paths[id])
+		return self.parsed[id]
+
 
 # Get artboard bounds (to use Illustrator terminology) from SVG DOM tree:
 def getViewBox(root):
+	if isinstance(root, svg_index_t): return root.viewBox
 	for node in root.childNodes:
 		if node.nodeType == node.ELEMENT_NODE:
 			vb = getViewBox(node)
@@ -17,6 +67,7 @@ def getViewBox(root):
 
 # Search for and return a specific path (by name) in SVG DOM tree:
 def getPath(root, id):
+	if isinstance(root, svg_index_t): return root.path(id)
 	for node in root.childNodes:
 		if node.nodeType == node.ELEMENT_NODE:
 			p = getPath(node, id)
@@ -27,69 +78,229 @@ def getPath(root, id):
 	return None
 
 
+# Cubic Bernstein basis at an array of positions, shape (len(t), 4)
+def bernstein(t):
+	u = 1.0 - t
+	return np.stack([u * u * u, 3.0 * u * u * t, 3.0 * u * t * t, t * t * t], axis=-1)
+
+
+# Quadratic Bernstein basis (for cubic derivatives), shape (len(t), 3)
+def bernstein2(t):
+	u = 1.0 - t
+	return np.stack([u * u, 2.0 * u * t, t * t], axis=-1)
+
+
+# Elliptical arc segment at an array of positions, as Arc.point()
+def arcPoints(seg, t):
+	if seg.start == seg.end: return np.full(len(t), seg.start, dtype=complex)
+	angle = np.radians(seg.theta + seg.delta * t)
+	cosr  = math.cos(math.radians(seg.rotation))
+	sinr  = math.sin(math.radians(seg.rotation))
+	x     = np.cos(angle) * seg.radius.real
+	y     = np.sin(angle) * seg.radius.imag
+	return ((cosr * x - sinr * y + seg.center.real) +
+	        (sinr * x + cosr * y + seg.center.imag) * 1j)
+
+
+# Speed (length of the derivative) of an arc segment at positions t
+def arcSpeed(seg, t):
+	if seg.start == seg.end: return np.zeros(len(t))
+	angle = np.radians(seg.theta + seg.delta * t)
+	return abs(math.radians(seg.delta)) * np.hypot(
+	  np.sin(angle) * seg.radius.real, np.cos(angle) * seg.radius.imag)
+
+
+# Gauss-Legendre nodes and weights on [-1, 1] for segment lengths
+GAUSS_X, GAUSS_W = np.polynomial.legendre.leggauss(16)
+
+
+# Vectorized stand-in for svg.path's path.point().  Lines, quadratics
+# (and moves) are raised to cubics so every segment but arcs is four
+# complex control points, evaluated for any number of positions with one
+# Bernstein product.  Segment lengths are measured once, integrating the
+# curve speed with Gauss-Legendre quadrature over pieces that are halved
+# until the lengths settle to within 'error' SVG units.  As with path.point(), each segment covers a
+# share of the 0.0-1.0 position range equal to its share of the length,
+# and within a segment position maps linearly to the curve parameter.
+class path_sampler_t(object):
+	def __init__(self, path, error=1e-5):
+		self.segs  = list(path)
+		self.ctrl  = np.zeros((len(self.segs), 4), dtype=complex)
+		self.arcs  = []
+		for k, seg in enumerate(self.segs):
+			kind = type(seg).__name__
+			if kind in ("Line", "Close"):
+				d = (seg.end - seg.start) / 3.0
+				self.ctrl[k] = (seg.start, seg.start + d, seg.end - d, seg.end)
+			elif kind == "CubicBezier":
+				self.ctrl[k] = (seg.start, seg.control1, seg.control2, seg.end)
+			elif kind == "QuadraticBezier":
+				self.ctrl[k] = (seg.start,
+				                seg.start + (seg.control - seg.start) * (2.0 / 3.0),
+				                seg.end   + (seg.control - seg.end  ) * (2.0 / 3.0),
+				                seg.end)
+			elif kind == "Move":
+				self.ctrl[k] = seg.start
+			else:
+				self.arcs.append(k)
+		self.lengths   = self.measure(error)
+		self.fractions = np.cumsum(self.lengths / self.lengths.sum())
+
+	# Curve speed of every segment at positions t, shape (segments, len(t))
+	def speed(self, t):
+		dctrl = 3.0 * np.diff(self.ctrl, axis=1)
+		spd   = np.abs(dctrl.dot(bernstein2(t).T))
+		for k in self.arcs: spd[k] = arcSpeed(self.segs[k], t)
+		return spd
+
+	def measure(self, error):
+		n       = 1
+		lengths = None
+		while True:
+			# n equal pieces of each segment, 16 nodes per piece
+			t    = ((np.arange(n)[:, None] + (GAUSS_X + 1.0) / 2.0) / n).ravel()
+			prev = lengths
+			lengths = self.speed(t).dot(np.tile(GAUSS_W, n) / (2.0 * n))
+			if prev is not None and (np.abs(lengths - prev).max() <= error or
+			                         n >= (1 << 10)):
+				return lengths
+			n *= 2
+
+	# Complex points at an array of path positions (0.0 to 1.0)
+	def points(self, pos):
+		pos   = np.asarray(pos, dtype=float)
+		i     = np.minimum(np.searchsorted(self.fractions, pos, side='right'),
+		                   len(self.segs) - 1)
+		start = np.where(i > 0, self.fractions[np.maximum(i - 1, 0)], 0.0)
+		width = self.fractions[i] - start
+		t     = (pos - start) / np.where(width > 0, width, 1.0)
+		pts   = (bernstein(t) * self.ctrl[i]).sum(axis=1)
+		for k in self.arcs:
+			mask = (i == k)
+			if mask.any(): pts[mask] = arcPoints(self.segs[k], t[mask])
+		# Ends are taken straight from the first and last segments
+		pts[pos == 0.0] = self.segs[0].start
+		pts[pos == 1.0] = self.segs[-1].end
+		return pts
+
+
 # Convert SVG path to a 2D point list. Provide path, number of points,
 # and whether or not this is a closed path (loop). For closed loops, the
 # size of the point list returned is one element larger than the number of
 # points passed, and the first and last elements will coincide.
-def pathToPoints(path, numPoints, closed, reverse):
-	points = []
+# Point lists are contiguous float32 numpy arrays of shape (n, 2).
+# 'error' is the segment length tolerance (SVG units) used to space the
+# points; 1e-5 keeps them within a few thousandths of a pixel of
+# path.point() at eye sizes.
+def pathToPoints(path, numPoints, closed, reverse, error=1e-5):
+	return pathToPointsAt(path, uniformCoords(numPoints, closed), closed,
+	                      reverse, error)
+
+
+# Evenly spaced sample fractions for pathToPointsAt(), as pathToPoints()
+# uses; closed lists get the extra 1.0 for the repeated first point.
+def uniformCoords(numPoints, closed):
 	if numPoints < 2: numPoints  = 2
-	if closed is True: div = float(numPoints)
-	else:              div = float(numPoints - 1)
-	for p in range(numPoints):
-		if reverse is True: pt = path.point(1.0 - p / div, error=1e-5)
-		else:               pt = path.point(      p / div, error=1e-5)
-		points.append((pt.real, pt.imag))
-	if closed is True: points.append(points[0])
+	if closed is True: return np.arange(numPoints + 1) / float(numPoints)
+	else:              return np.arange(numPoints) / float(numPoints - 1)
+
+
+# Same as pathToPoints() but sampled at the given fractions (0.0 to 1.0
+# along the point list, one per point returned, a closed list ending in
+# 1.0) instead of evenly; reversed paths are read from 1.0 - fraction.
+# The fractions double as mesh U coordinates, see meshInit().
+def pathToPointsAt(path, uCoords, closed, reverse, error=1e-5):
+	uCoords = np.asarray(uCoords, dtype=float)
+	if reverse is True: pos = 1.0 - uCoords
+	else:               pos = uCoords
+	if closed is True:  pos = pos[:-1]
+	pts    = path_sampler_t(path, error).points(pos)
+	points = np.empty((len(uCoords), 2), dtype=np.float32)
+	points[:len(pos),0] = pts.real
+	points[:len(pos),1] = pts.imag
+	if closed is True: points[-1] = points[0]
 	return points
 
 
+# Curvature-adaptive sample fractions for pathToPointsAt(), shared by a
+# group of paths whose point lists must line up index for index (e.g. an
+# eyelid's edge, open and closed paths).  Points are spaced so that no
+# chord strays more than 'tolerance' (SVG units) from any of the curves:
+# a span of length L turning through angle A sags about L * A / 8, so
+# each piece of a dense sampling needs sqrt(L * A / (8 * tolerance))
+# intervals and the fractions are spread evenly over that running total.
+# Straight runs still get a point every 1/minPoints of the list so
+# texture mapping stays even.  The point count (not counting a closed
+# list's repeated first point) stays within minPoints..maxPoints.
+def adaptiveCoords(paths, reverse, closed, tolerance, minPoints=8,
+                   maxPoints=128, error=1e-5, dense=1024):
+	u    = np.linspace(0.0, 1.0, dense + 1)
+	cost = np.zeros(dense)
+	for path, rev in zip(paths, reverse):
+		if rev is True: pts = path_sampler_t(path, error).points(1.0 - u)
+		else:           pts = path_sampler_t(path, error).points(u)
+		chord = np.diff(pts)
+		# Turning angle at each dense point; ends of an open path don't turn
+		turn  = np.abs(np.angle(chord[1:] * np.conj(chord[:-1])))
+		if closed is True: end = abs(np.angle(chord[0] * np.conj(chord[-1])))
+		else:              end = 0.0
+		turn  = np.concatenate(([end], turn, [end]))
+		# Each piece gets half the turning at either end
+		angle = (turn[:-1] + turn[1:]) * 0.5
+		cost  = np.maximum(cost, np.sqrt(np.abs(chord) * angle / (8.0 * tolerance)))
+	cost = np.maximum(cost, minPoints / float(dense))
+
+	if closed is True: n = min(max(int(math.ceil(cost.sum())), minPoints), maxPoints)
+	else:              n = min(max(int(math.ceil(cost.sum())) + 1, minPoints), maxPoints) - 1
+	total = np.concatenate(([0.0], np.cumsum(cost)))
+	return np.interp(np.arange(n + 1) * (total[-1] / n), total, u)
+
+
 # Combo wrapper for pathToPoints(getPath(...))
 def getPoints(root, id, numPoints, closed, reverse):
 	return pathToPoints(getPath(root, id), numPoints, closed, reverse)
 
 
+# Combo wrapper for pathToPointsAt(getPath(...))
+def getPointsAt(root, id, uCoords, closed, reverse):
+	return pathToPointsAt(getPath(root, id), uCoords, closed, reverse)
+
+
 # Scale a given 2D point list by normalizing to a given view box (returned
 # by getViewBox()) then expanding to a given size centered on (0,0).
+# The point array is modified in place.
 def scalePoints(p, vb, offset_x, offset_y, radius):
-	for i, pt in enumerate(p): # Each point in path
-		xx = ((p[i][0] - vb[0]) / vb[2] - 0.5) * radius *  2.0
-		yy = ((p[i][1] - vb[1]) / vb[3] - 0.5) * radius * -2.0
-                xx += offset_x
-                yy += offset_y
-		p[i] = (xx, yy)
+	p[:,0] = ((p[:,0] - vb[0]) / vb[2] - 0.5) * radius *  2.0 + offset_x
+	p[:,1] = ((p[:,1] - vb[1]) / vb[3] - 0.5) * radius * -2.0 + offset_y
 
 
 # Interpolate between two 2D point lists, returning a new point list.
 # Specify weighting (0.0 to 1.0) of second list.
 # Lists should have same number of points; if not, lesser point count
-# is used and the output may be weird.
-def pointsInterp(points1, points2, p2weight):
+# is used and the output may be weird.  If 'out' is passed (an (n, 2)
+# float32 array) the result is written there instead of a new array.
+def pointsInterp(points1, points2, p2weight, out=None):
 	if   p2weight < 0.0: p2weight = 0.0
 	elif p2weight > 1.0: p2weight = 1.0
 	p1weight = 1.0 - p2weight
-	points   = []
 	np1      = len(points1)
 	np2      = len(points2)
 	if np2 < np1: np1 = np2
 	if np1 < 1  : return None
-	for p in range(np1):
-		x = points1[p][0] * p1weight + points2[p][0] * p2weight
-		y = points1[p][1] * p1weight + points2[p][1] * p2weight
-		points.append((x, y))
-	return points
+	points1  = np.asarray(points1, dtype=np.float32)[:np1]
+	points2  = np.asarray(points2, dtype=np.float32)[:np1]
+	if out is None: out = np.empty((np1, 2), dtype=np.float32)
+	np.multiply(points1, p1weight, out=out)
+	out += points2 * p2weight
+	return out
 
 
 # Return bounding rect of 2D point list
 def pointsBounds(points):
-	b = [ points[0][0], points[0][1], points[0][0], points[0][1] ]
-	n = len(points)
-	for p in range(1, n):
-		if points[p][0] < b[0]: b[0] = points[p][0]
-		if points[p][1] < b[1]: b[1] = points[p][1]
-		if points[p][0] > b[2]: b[2] = points[p][0]
-		if points[p][1] > b[3]: b[3] = points[p][1]
-	return b # 4-element list: min X, min Y, max X, max Y
+	points = np.asarray(points)
+	lo     = points.min(axis=0)
+	hi     = points.max(axis=0)
+	return [ lo[0], lo[1], hi[0], hi[1] ] # min X, min Y, max X, max Y
 
 
 # This function rotates a model 90 degrees on the X axis and applies an
@@ -104,17 +315,51 @@ def pointsBounds(points):
 # tex_coords = buf[6,7,8]
 def reAxis(shape, texOffset):
 	buf = shape.buf[0].array_buffer
-	for i, v in enumerate(buf):
-		# Rotate vertex
-		tmp        = buf[i][1]
-		buf[i][1]  = buf[i][2]
-		buf[i][2]  = -tmp
-		# Rotate normal
-		tmp        = buf[i][4]
-		buf[i][4]  = buf[i][5]
-		buf[i][5]  = -tmp
-		# Offset texture map on U axis
-		buf[i][6] += texOffset
+	# Rotate vertices and normals, (x, y, z) -> (x, z, -y)
+	buf[:,[1,2,4,5]] = buf[:,[2,1,5,4]] * np.array([1, -1, 1, -1], dtype=np.float32)
+	# Offset texture map on U axis
+	buf[:,6] += texOffset
+
+
+# Same shape as pi3d.Lathe(path=path, sides=sides) followed by
+# reAxis(shape, texOffset), i.e. lathed around the Z axis, but built
+# with array operations instead of per-vertex Python loops.
+def latheZ(path, sides, texOffset):
+	path = np.asarray(path, dtype=float)
+	rows = len(path)
+	cols = sides + 1
+	# V runs along the path by length; U runs backwards around the turn
+	step = np.hypot(*np.diff(path, axis=0).T)
+	v    = np.concatenate(([0.0], np.cumsum(step / step.sum())))
+	u    = 1.0 - np.arange(cols) / float(sides)
+	# Path direction into each point (none for the first), for normals
+	d    = np.vstack(([0.0, 0.0], np.diff(path, axis=0)))
+	n    = np.hypot(d[:,0], d[:,1])
+	d   /= np.where(n > 0, n, 1.0)[:,None]
+	a    = (math.pi / sides) * 2.0 * np.arange(cols)
+	sinr = np.sin(a)[None,:]
+	cosr = np.cos(a)[None,:]
+	px   = path[:,0:1]
+	py   = path[:,1:2]
+	dx   = d[:,0:1]
+	dy   = d[:,1:2]
+
+	buf  = np.empty((rows, cols, 8), dtype=np.float32)
+	buf[:,:,0] =  px * sinr
+	buf[:,:,1] =  px * cosr
+	buf[:,:,2] = -py
+	buf[:,:,3] = -sinr * dy
+	buf[:,:,4] = -cosr * dy
+	buf[:,:,5] = -dx
+	buf[:,:,6] = u[None,:].astype(np.float32) + np.float32(texOffset)
+	buf[:,:,7] = v[:,None]
+
+	# Two triangles per quad, same winding and order as pi3d
+	pp  = (np.arange(rows - 1) * cols)[:,None] + np.arange(sides)[None,:]
+	pn  = pp + cols
+	idx = np.stack([pp + 1, pp, pn, pn, pn + 1, pp + 1], axis=-1)
+
+	return buffer_shape_t(buf.reshape(-1, 8), idx.reshape(-1, 3))
 
 
 
@@ -137,19 +382,26 @@ def reAxis(shape, texOffset):
 
 # If it's an eyelid, add an extra row with V=0.0
 
-def meshInit(uSteps, vSteps, closed, uOffset, vOffset, lid):
+# uCoords, if given, are the U texture coordinates of each column (e.g.
+# the sample fractions from adaptiveCoords()) and set the column count
+# instead of uSteps; a closed mesh's uCoords already include the seam.
+
+def meshInit(uSteps, vSteps, closed, uOffset, vOffset, lid, uCoords=None):
 	verts = []
 	tex   = []
 	idx   = []
 	norms = []
-	if closed is True: uSteps += 1
-	uDiv  = float(uSteps - 1)
+	if uCoords is not None:
+		uSteps = len(uCoords)
+	else:
+		if closed is True: uSteps += 1
+		uCoords = uniformCoords(uSteps, False)
 	vDiv  = float(vSteps - 1)
 
 	if lid is True: # Add extra row of vertices (with V=0) if eyelid
 		for u in range(uSteps):
 			verts.append((0,0,0))
-			tex.append((u / uDiv + uOffset, vOffset))
+			tex.append((uCoords[u] + uOffset, vOffset))
 			norms.append((0,0,-1))
 		vRange = vSteps
 	else:
@@ -159,7 +411,7 @@ def meshInit(uSteps, vSteps, closed, uOffset, vOffset, lid):
 		v2 = vOffset + (v / vDiv) * (1.0 - vOffset * 2.0)
 		for u in range(uSteps):
 			verts.append((0,0,0))
-			tex.append((u / uDiv + uOffset, v2))
+			tex.append((uCoords[u] + uOffset, v2))
 			norms.append((0,0,-1))
 
 	for v in range(vRange):
@@ -168,47 +420,220 @@ def meshInit(uSteps, vSteps, closed, uOffset, vOffset, lid):
  			idx.append((s+uSteps, s         , s+1     ))
  			idx.append((s+1     , s+uSteps+1, s+uSteps))
 
-	shape = pi3d.Shape(None, None, "foo", 0.0, 0.0, 0.0, 0.0, 0.0, 0.0,
-	  1.0, 1.0, 1.0, 0.0, 0.0, 0.0)
-	shape.buf = []
-	shape.buf.append(pi3d.Buffer(shape, verts, tex, idx, norms, False))
-
-	return shape
+	return dynamic_mesh_t(verts, tex, idx, norms)
+
+
+# Shape for meshes whose vertex positions are regenerated at run time
+# (iris, eyelids).  Indices, normals and texture coordinates are fixed
+# when built.  update_pts() writes new positions into the interleaved
+# buffer and uploads only the span of vertices that changed, where
+# Shape.re_init() re-sends the whole buffer every time.
+class dynamic_mesh_t(pi3d.Shape):
+	def __init__(self, verts, tex, idx, norms):
+		super(dynamic_mesh_t, self).__init__(None, None, "foo",
+		  0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 1.0, 1.0, 1.0, 0.0, 0.0, 0.0)
+		self.buf = [pi3d.Buffer(self, verts, tex, idx, norms, False)]
+		# Preallocated vertex array for pointsMesh(..., out=self.verts)
+		self.verts = np.zeros((len(verts), 3), dtype=np.float32)
+
+	def update_pts(self, pts):
+		buf     = self.buf[0]
+		ab      = buf.array_buffer
+		n       = len(pts)
+		changed = np.flatnonzero((ab[:n,0:3] != pts).any(axis=1))
+		if len(changed) == 0: return
+		first   = changed[0]
+		last    = changed[-1] + 1
+		ab[first:last,0:3] = pts[first:last]
+		self.upload(first, last)
+
+	# Vertex layout for shaders/blend_light, where the GPU blends between
+	# two meshes: verts1 and verts2 ((n, 3) arrays) are the positions at
+	# blend weight 0.0 and 1.0 (Z is taken from verts1), and place (n) is
+	# where each vertex sits between the two weights given to set_blend().
+	# These go where the normals were; the shader uses a fixed normal.
+	def set_blend_verts(self, verts1, verts2, place):
+		ab = self.buf[0].array_buffer
+		ab[:,0:3] = verts1
+		ab[:,3:5] = verts2[:,0:2]
+		ab[:,5]   = place
+		self.upload(0, len(ab))
+
+	# Blend weights for shaders/blend_light (unif[16]).  The mesh always
+	# runs from the lesser to the greater weight, as pointsTableMesh().
+	def set_blend(self, weight1, weight2):
+		if weight2 < weight1: weight1, weight2 = weight2, weight1
+		self.set_custom_data(48, [weight1, weight2, 0.0])
+
+	def upload(self, first, last):
+		buf = self.buf[0]
+		# Before the first draw the whole buffer is uploaded anyway
+		if not buf.opengl_loaded: return
+		ab     = buf.array_buffer
+		stride = ab.strides[0]
+		buf._select()
+		opengles.glBufferSubData(GL_ARRAY_BUFFER,
+		  GLintptr(first * stride), GLsizeiptr((last - first) * stride),
+		  ab[first:last].ctypes.data_as(ctypes.POINTER(GLfloat)))
+
+
+# Static shape built straight from an interleaved vertex array (x, y, z,
+# nx, ny, nz, u, v per row, as in Buffer.array_buffer) and its triangle
+# indices, e.g. a sclera Lathe that was baked to disk after reAxis().
+class buffer_shape_t(pi3d.Shape):
+	def __init__(self, array_buffer, element_array_buffer):
+		super(buffer_shape_t, self).__init__(None, None, "foo",
+		  0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 1.0, 1.0, 1.0, 0.0, 0.0, 0.0)
+		self.buf = [pi3d.Buffer(self, array_buffer[:,0:3],
+		  array_buffer[:,6:8], element_array_buffer,
+		  array_buffer[:,3:6], False)]
 
 
 # Generate mesh between two point lists. U axis steps are determined
-# by number of points, V axis determined by 'steps'
-def pointsMesh(points0, points1, points2, steps, z, closed, flip=False):
+# by number of points, V axis determined by 'steps'.  The optional
+# points0 row (eyelid edge) is placed first at Z=0.  Vertices are
+# written to 'out' (an (n, 3) float32 array, e.g. a mesh's preallocated
+# vertex array) if passed, otherwise a new array is returned; either way
+# the result can be handed to Shape.re_init() without conversion.
+def pointsMesh(points0, points1, points2, steps, z, closed, flip=False, out=None):
 	if steps < 2: steps = 2
 	np1 = len(points1)
 	np2 = len(points2)
 	if np2 < np1: np1 = np2
 	if np1 < 1  : return None
 
-	verts = []
+	points1 = np.asarray(points1, dtype=np.float32)[:np1]
+	points2 = np.asarray(points2, dtype=np.float32)[:np1]
+	if points0 is not None:
+		points0 = np.asarray(points0, dtype=np.float32)
+		np0     = len(points0)
+	else:
+		np0     = 0
+	if out is None: out = np.empty((np0 + steps * np1, 3), dtype=np.float32)
+
+	if flip is True: # Mirror on X and reverse point order
+		if points0 is not None: points0 = points0[::-1]
+		points1 = points1[::-1]
+		points2 = points2[::-1]
+
+	if points0 is not None:
+		out[:np0,0:2] = points0
+		out[:np0,2]   = 0
+
+	# Row y is pointsInterp(points1, points2, y / (steps - 1))
+	w    = (np.arange(steps, dtype=np.float32) / (steps - 1))[:,None,None]
+	rows = out[np0:].reshape(steps, np1, 3)
+	rows[:,:,0:2] = points1 * (1.0 - w) + points2 * w
+	rows[:,:,2]   = z
+
+	if flip is True: out[:,0] *= -1.0
+
+	return out
+
+
+# Blend mesh for dynamic_mesh_t.set_blend_verts(): the same vertices as
+# pointsMesh(points0, points1, points2, steps, ...) where each row k is
+# placed k / (steps - 1) between the two blend weights, so blending
+# weights w1..w2 gives rows interpolated from w1 to w2 between points1
+# and points2 (open and closed eyelid), as pointsTableMesh() does.
+# Returns (verts1, verts2, place).
+def pointsBlendMesh(points0, points1, points2, steps, z, closed, flip=False):
+	verts1 = pointsMesh(points0, points1, points1, steps, z, closed, flip)
+	verts2 = pointsMesh(points0, points2, points2, steps, z, closed, flip)
+	if steps < 2: steps = 2
+	if points0 is not None: np0 = len(points0)
+	else:                   np0 = 0
+	# Edge row (if any) is the same in both, so its place doesn't matter
+	place  = np.zeros(len(verts1), dtype=np.float32)
+	place[np0:] = np.repeat(np.arange(steps, dtype=np.float32) / (steps - 1),
+	                        (len(verts1) - np0) // steps)
+	return verts1, verts2, place
+
+
+# Precompute every distinct eyelid row for pointsTableMesh().  Rows are
+# interpolated between points1 (weight 0.0) and points2 (weight 1.0) in
+# steps of 'threshold' (the 1/2 pixel regen threshold), already flipped
+# and at depth z, so building a mesh later is just a table lookup.
+# points0 (eyelid edge) is likewise stored as a ready vertex row.
+def pointsTable(points0, points1, points2, threshold, z, flip=False):
+	if threshold > 0: steps = int(math.ceil(1.0 / threshold))
+	else:             steps = 1 # Open and closed coincide
+	np1 = len(points1)
+	np2 = len(points2)
+	if np2 < np1: np1 = np2
+	if np1 < 1  : return None
 
-	if flip is True:
-		if points0 is not None:
-			for p in reversed(points0):
-				verts.append((-p[0], p[1], 0))
+	edge = pointsMesh(None, points0, points0, 2, 0, False, flip)[:len(points0)]
+	rows = pointsMesh(None, points1, points2, steps + 1, z, False, flip)
 
-		div = float(steps - 1)
-		for y in range(steps):
-			pList = pointsInterp(points1, points2, y / div)
-			for x in reversed(range(np1)):
-				verts.append((-pList[x][0], pList[x][1], z))
-	else:
-		if points0 is not None:
-			for p in points0:
-				verts.append((p[0], p[1], 0))
+	return { 'edge' : edge,
+	         'rows' : rows.reshape(steps + 1, np1, 3),
+	         'steps': steps }
 
-		div = float(steps - 1)
-		for y in range(steps):
-			pList = pointsInterp(points1, points2, y / div)
-			for x in range(np1):
-				verts.append((pList[x][0], pList[x][1], z))
 
-	return verts
+# Generate eyelid mesh from a pointsTable() between two weights; same
+# vertices as pointsMesh(points0, interp(weight1), interp(weight2), ...)
+# with each row snapped to the nearest table step.  The mesh always runs
+# from the lesser to the greater weight, so prev/new order is irrelevant.
+def pointsTableMesh(table, weight1, weight2, steps, out=None):
+	if steps < 2: steps = 2
+	lo   = min(max(min(weight1, weight2), 0.0), 1.0)
+	hi   = min(max(max(weight1, weight2), 0.0), 1.0)
+	edge = table['edge']
+	rows = table['rows']
+	np0  = len(edge)
+	if out is None:
+		out = np.empty((np0 + steps * rows.shape[1], 3), dtype=np.float32)
+
+	w   = lo + (hi - lo) * np.arange(steps) / float(steps - 1)
+	idx = np.rint(w * table['steps']).astype(np.intp)
+	out[:np0] = edge
+	np.take(rows, idx, axis=0, out=out[np0:].reshape(steps, -1, 3))
+
+	return out
+
+
+# Cache of ready mesh vertex arrays indexed by a scale value (0.0 to 1.0)
+# quantized to 'threshold' steps, e.g. iris meshes by pupil scale.
+# builder(scale, out) fills and returns an (n, 3) vertex array.  All steps
+# are built up front if they fit within max_bytes (None = no cap), else,
+# or if lazy is True, entries are built on first use; once the cap is
+# reached further misses are built into a scratch array and not kept.
+class mesh_cache_t(object):
+	def __init__(self, builder, threshold, nverts, max_bytes=None, lazy=False):
+		self.builder = builder
+		if threshold > 0: self.steps = int(math.ceil(1.0 / threshold))
+		else:             self.steps = 1
+		self.entry_bytes = nverts * 3 * 4 # float32 x,y,z
+		if max_bytes is None: self.max_entries = self.steps + 1
+		else:                 self.max_entries = max_bytes // self.entry_bytes
+		self.scratch = np.empty((nverts, 3), dtype=np.float32)
+		self.entries = {}
+		self.hits = 0
+		self.misses = 0
+		if not lazy and self.max_entries >= self.steps + 1:
+			table = np.empty((self.steps + 1, nverts, 3), dtype=np.float32)
+			for i in range(self.steps + 1):
+				self.entries[i] = builder(i / float(self.steps), table[i])
+
+	def get(self, scale):
+		if   scale < 0.0: scale = 0.0
+		elif scale > 1.0: scale = 1.0
+		i = int(round(scale * self.steps))
+		verts = self.entries.get(i)
+		if verts is not None:
+			self.hits += 1
+			return verts
+		self.misses += 1
+		if len(self.entries) < self.max_entries:
+			verts = self.builder(i / float(self.steps),
+			                     np.empty_like(self.scratch))
+			self.entries[i] = verts
+			return verts
+		return self.builder(i / float(self.steps), self.scratch)
+
+	def nbytes(self):
+		return len(self.entries) * self.entry_bytes
 
 
 # This function determines the Z depth and angle-from-Z axis of an SVG
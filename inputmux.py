@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+
+import errno
+import select
+
+# One readiness check per frame for every input the eye listens to
+# (evdev keyboard and joystick, the wearables and eye_comm multicast
+# sockets): sources are registered once with an epoll set and poll()
+# answers which of them have something to read in a single syscall, so
+# the per-frame cost does not grow with the number of sources and
+# nothing is read (or raises EWOULDBLOCK) when nothing arrived.
+# Where there is no epoll (not Linux) poll(2) does the same job.
+class input_mux_t(object):
+    def __init__(self,debug=False):
+        self.debug = debug
+        if hasattr(select, 'epoll'):
+            self.poller = select.epoll()
+            self.mask = select.EPOLLIN | select.EPOLLERR | select.EPOLLHUP
+            self.timeout_scale = 1.0 # epoll.poll() takes seconds
+        else:
+            self.poller = select.poll()
+            self.mask = select.POLLIN | select.POLLERR | select.POLLHUP
+            self.timeout_scale = 1000.0 # poll.poll() takes milliseconds
+        self.fds = {} # name -> fd
+        self.names = {} # fd -> name
+        self.polls = 0
+        self.ready_cnt = {}
+
+    # fileobj: anything with fileno() (sockets, evdev.InputDevice).
+    # Registering a name again replaces its old source.
+    def register(self,name,fileobj):
+        self.unregister(name)
+        fd = fileobj.fileno()
+        stale = self.names.get(fd)
+        if stale is not None:
+            # fd of a source that was closed without unregistering
+            del self.fds[stale]
+        try:
+            self.poller.register(fd, self.mask)
+        except (IOError, OSError) as e:
+            if e.errno != errno.EEXIST:
+                raise
+            self.poller.modify(fd, self.mask)
+        self.fds[name] = fd
+        self.names[fd] = name
+        self.ready_cnt.setdefault(name, 0)
+        if self.debug:
+            print ('input mux: {} on fd {}'.format(name,fd))
+
+    def unregister(self,name):
+        fd = self.fds.pop(name, None)
+        if fd is None or self.names.get(fd) != name:
+            return
+        del self.names[fd]
+        try:
+            self.poller.unregister(fd)
+        except (IOError, OSError, KeyError, ValueError) as e:
+            # Closed already (an unplugged device); the kernel dropped it
+            if self.debug:
+                print ('input mux: {} fd {}: {}'.format(name,fd,e))
+
+    # Names of the sources with input (or an error or hangup, which their
+    # reader then runs into), waiting up to timeout seconds
+    def poll(self,timeout=0.0):
+        self.polls += 1
+        try:
+            events = self.poller.poll(timeout * self.timeout_scale)
+        except (IOError, OSError, select.error) as e:
+            if e.args[0] == errno.EINTR:
+                return set()
+            raise
+        ready = set()
+        for (fd, event) in events:
+            name = self.names.get(fd)
+            if name is not None:
+                ready.add(name)
+                self.ready_cnt[name] += 1
+        return ready
+
+    def stats(self):
+        return '{} polls, ready: {}'.format(self.polls, ', '.join(
+            '{} {}'.format(name, self.ready_cnt[name]) for name in sorted(self.ready_cnt)))
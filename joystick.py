@@ -3,6 +3,7 @@
 from evdev import InputDevice, categorize, ecodes
 import time
 import random
+from clock import monotonic
 
 class joystick_t(object):
     def __init__(self,joystick_dev='/dev/input/event1',joystick_mode=0,debug=False):
@@ -10,7 +11,7 @@ class joystick_t(object):
         self.joystick_mode = joystick_mode
         self.debug = debug
         self.eye_direction_last = None
-        self.last_joystick_event_time = 0
+        self.last_joystick_event_time = None # No event yet
         try:
             print ('Called init joystick for device: {}'.format(self.joystick_dev))
             self.joystick = InputDevice(self.joystick_dev)
@@ -244,7 +245,7 @@ class joystick_t(object):
                     print ('Analog unhandled event: {}'.format(event))
 
         if len(gecko_events) > 0:
-            self.last_joystick_event_time = time.time()
+            self.last_joystick_event_time = monotonic()
                     
         return gecko_events
     
@@ -416,10 +417,11 @@ class joystick_t(object):
         gecko_events = self.opt_eye_event_queue(gecko_events)
 
         if len(gecko_events) > 0:
-            self.last_joystick_event_time = time.time()
+            self.last_joystick_event_time = monotonic()
         
         return gecko_events
 
+    # monotonic() seconds of the last event, None if there has been none
     def get_last_joystick_time(self):
         return self.last_joystick_event_time
     
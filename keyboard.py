@@ -23,10 +23,17 @@ class keyboard_t(object):
     def get_status(self):
         return (self.keyboard is not None)
         
-    def sample(self):
+    # ready: whether the device has input, if the caller already polled
+    # it (see inputmux.py); None to check here
+    def sample(self,ready=None):
         events = []
         if self.keyboard is not None:
-            r,w,x = select(self.devices,[],[], 0)
+            if ready is None:
+                r,w,x = select(self.devices,[],[], 0)
+            elif ready:
+                r = [self.keyboard.fd]
+            else:
+                r = []
 
             for fd in r:
                 try:
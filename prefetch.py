@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+
+import threading
+from rawcache import decode_image
+
+# Decodes the textures of the next eye on a background thread so that
+# switching to it (mid-blink) only uploads pixels to the GPU, or does
+# nothing at all if upload() already ran on an earlier frame.  Pillow
+# releases the GIL while decoding, so the render loop keeps running.
+#
+# Items are (fname, make_texture, decode): make_texture(fname, pixels)
+# turns the decoded numpy array (None when decode is False, e.g. the
+# texture is already loaded) into a texture and is only ever called from
+# the render thread (GL calls).  A None fname gives a None texture.
+class texture_prefetch_t(object):
+    def __init__(self,debug=False):
+        self.debug = debug
+        self.thread = None
+        self.fnames = None
+        self.factories = None
+        self.arrays = None
+        self.textures = None
+        self.error = None
+        self.load = decode_image # fname -> pixels, e.g. raw_cache_t.load
+
+    def decode(self,fnames,decodes):
+        arrays = []
+        try:
+            for (fname, decode) in zip(fnames, decodes):
+                if fname is None or not decode:
+                    arrays.append(None)
+                    continue
+                arrays.append(self.load(fname))
+        except (IOError, OSError) as e:
+            self.error = e
+            return
+        self.arrays = arrays
+        if self.debug:
+            print ('prefetch: decoded {}'.format(fnames))
+
+    def start(self,items):
+        # One prefetch at a time; a new one replaces what was not taken
+        self.wait()
+        self.fnames = tuple(fname for (fname, make_texture, decode) in items)
+        self.factories = [make_texture for (fname, make_texture, decode) in items]
+        decodes = [decode for (fname, make_texture, decode) in items]
+        self.arrays = None
+        self.textures = None
+        self.error = None
+        self.thread = threading.Thread(target=self.decode, args=(self.fnames, decodes))
+        self.thread.daemon = True
+        self.thread.start()
+
+    def ready(self):
+        return self.thread is not None and not self.thread.is_alive()
+
+    def wait(self):
+        if self.thread is not None:
+            self.thread.join()
+
+    # Render thread: turn decoded pixels into textures once they are ready
+    def upload(self):
+        if self.textures is None and self.ready() and self.arrays is not None:
+            self.textures = [None if fname is None else make_texture(fname, a)
+                             for (fname, a, make_texture) in
+                             zip(self.fnames, self.arrays, self.factories)]
+            self.arrays = None
+            if self.debug:
+                print ('prefetch: uploaded {}'.format(self.fnames))
+        return self.textures
+
+    # Hands over (fnames, textures), waiting for the decode if need be.
+    # None when nothing was prefetched or decoding failed.
+    def take(self):
+        if self.thread is None:
+            return None
+        self.wait()
+        textures = self.upload()
+        fnames = self.fnames
+        if self.error is not None:
+            print ('prefetch: {}'.format(self.error))
+        self.thread = None
+        self.arrays = None
+        self.textures = None
+        if textures is None:
+            return None
+        return (fnames, textures)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+
+import random
+
+# Simulated pupil response when there is no analog sensor: the pupil
+# moves from one scale to the next along a fractal curve, made by
+# splitting the move in half and nudging the midpoint by a random amount
+# within +/- range, then splitting each half the same way with half the
+# range, until the range drops under min_range.  The curve is worked out
+# up front as keyframes (one per leaf, all the same duration, in the
+# order the random midpoints used to be drawn) so that value() is a
+# lookup plus a linear interpolation, and the render loop can drop the
+# curve at any frame.
+class pupil_trajectory_t(object):
+    def __init__(self,pupil_min=0.0,pupil_max=1.0,min_range=0.125,value=0.5):
+        self.pupil_min = pupil_min
+        self.pupil_max = pupil_max
+        self.min_range = min_range
+        self.keys = [value] # Holds still until the first start()
+        self.start_sec = 0.0
+        self.duration = 0.0
+        self.leaf_duration = 0.0
+
+    def start(self,now_sec,startValue,endValue,duration,range=1.0):
+        # Depth first, left half before right, without recursion
+        keys = [startValue]
+        stack = [(startValue, endValue, range)]
+        while len(stack) > 0:
+            (v0, v1, r) = stack.pop()
+            if r >= self.min_range:
+                r *= 0.5
+                mid = (v0 + v1 - r) * 0.5 + random.uniform(0.0, r)
+                stack.append((mid, v1, r))
+                stack.append((v0, mid, r))
+            else:
+                keys.append(v1)
+        leaves = len(keys) - 1
+        self.keys = keys
+        self.start_sec = now_sec
+        self.duration = duration
+        self.leaf_duration = duration / float(leaves)
+
+    def done(self,now_sec):
+        return now_sec - self.start_sec >= self.duration
+
+    # Scale along the curve, not clamped (so a new curve can start from it)
+    def value(self,now_sec):
+        dt = now_sec - self.start_sec
+        if dt >= self.duration:
+            return self.keys[-1]
+        if dt <= 0.0:
+            return self.keys[0]
+        f = dt / self.leaf_duration
+        i = min(int(f), len(self.keys) - 2)
+        return self.keys[i] + (self.keys[i + 1] - self.keys[i]) * (f - i)
+
+    def scale(self,now_sec):
+        return min(max(self.value(now_sec), self.pupil_min), self.pupil_max)
+
+    def end(self):
+        return self.keys[-1]
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+import os
+import struct
+import hashlib
+import threading
+import numpy as np
+from PIL import Image
+
+# Decoded images on disk: each source image (progressive JPEG, PNG) is
+# decoded once into raw pixels and memory-mapped afterwards, so a cold
+# texture load is a page-cache read and the mapped array goes straight
+# to glTexImage2D (pi3d.Texture takes numpy arrays as they are).
+#
+# File layout:
+#   magic (4 bytes) | height, width, channels (uint32, little endian)
+#   | pixels (uint8, rows top to bottom)
+# Files are keyed by the source path, size and mtime plus the target size,
+# so editing the art or changing the size makes a new entry.
+RAW_MAGIC = b'RAW1'
+RAW_HEADER = struct.Struct('<4sIII') # 16 bytes, keeps the pixels aligned
+
+# Same pixels pi3d.Texture would make from the file (see its
+# _img_to_array), always (height, width, channels)
+def decode_image(fname,size=None):
+    im = Image.open(fname)
+    if size is not None and im.size != tuple(size):
+        im = im.resize(tuple(size), Image.BICUBIC)
+    if im.mode not in ('RGBA', 'RGB', 'LA', 'L'):
+        im = im.convert('RGBA')
+    if im.mode == 'LA':
+        return np.array(im.convert('RGBA'))[:,:,2:4]
+    a = np.array(im)
+    if a.ndim == 2:
+        a = a[:,:,None]
+    return a
+
+# Read-only memory map of a raw file, None if missing or not valid
+def read_raw(fname_raw):
+    if not os.path.exists(fname_raw):
+        return None
+    try:
+        mm = np.memmap(fname_raw, dtype=np.uint8, mode='r')
+        (magic, height, width, channels) = RAW_HEADER.unpack(
+            mm[0:RAW_HEADER.size].tobytes())
+        if magic != RAW_MAGIC:
+            raise ValueError('bad magic')
+        if len(mm) != RAW_HEADER.size + height * width * channels:
+            raise ValueError('truncated')
+    except (ValueError, struct.error) as e:
+        print ('raw cache: ignoring {}: {}'.format(fname_raw,e))
+        return None
+    return mm[RAW_HEADER.size:].reshape((height, width, channels))
+
+def write_raw(fname_raw,a):
+    # Unique per thread: the hack eye prefetch fills the cache in the
+    # background; readers never see a partially written file
+    tmp = '{}.{}.{}.tmp'.format(fname_raw, os.getpid(),
+                                threading.current_thread().ident)
+    dir = os.path.dirname(fname_raw)
+    if dir and not os.path.isdir(dir):
+        os.makedirs(dir)
+    with open(tmp,'wb') as f:
+        f.write(RAW_HEADER.pack(RAW_MAGIC, a.shape[0], a.shape[1], a.shape[2]))
+        f.write(np.ascontiguousarray(a).tobytes())
+    os.rename(tmp, fname_raw)
+
+class raw_cache_t(object):
+    def __init__(self,cache_dir='cache/raw',debug=False):
+        self.debug = debug
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+
+    def key(self,fname,size=None):
+        st = os.stat(fname)
+        h = hashlib.sha1()
+        h.update(repr((os.path.abspath(fname), st.st_size, int(st.st_mtime),
+                       None if size is None else tuple(size))).encode('utf-8'))
+        return h.hexdigest()
+
+    def path(self,key):
+        return os.path.join(self.cache_dir,'{}.raw'.format(key))
+
+    # Pixels of fname (resized to size=(width, height) if given), decoding
+    # and saving them on a miss.  The result is a read-only memory map.
+    def load(self,fname,size=None):
+        if self.cache_dir is None:
+            return decode_image(fname,size)
+
+        fname_raw = self.path(self.key(fname,size))
+        a = read_raw(fname_raw)
+        if a is not None:
+            self.hits += 1
+            return a
+
+        self.misses += 1
+        a = decode_image(fname,size)
+        try:
+            write_raw(fname_raw,a)
+        except (IOError, OSError) as e:
+            print ('raw cache: cannot write {}: {}'.format(fname_raw,e))
+        if self.debug:
+            print ('raw cache: decoded {}'.format(fname))
+        return a
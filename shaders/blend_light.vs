@@ -0,0 +1,53 @@
+// uv_light with the vertex position blended between two meshes on the
+// GPU, so a mesh can change shape without regenerating its buffer.
+//   vertex    : position at blend weight 0.0
+//   normal.xy : position (x, y) at blend weight 1.0, z as vertex.z
+//   normal.z  : where the vertex sits between the two weights in
+//               unif[16][0] and unif[16][1] (0.0: first, 1.0: second)
+// Meshes drawn with this are flat and face the camera, so lighting uses
+// a fixed (0, 0, -1) normal in place of the normal attribute.
+#include std_head_vs.inc
+
+varying vec2 texcoordout;
+varying vec3 lightVector;
+varying float lightFactor;
+
+void main(void) {
+  vec3 normout;
+  float weight = mix(unif[16][0], unif[16][1], normal.z);
+  vec3 posn = vec3(mix(vertex.xy, normal.xy, weight), vertex.z);
+  vec3 nrm = vec3(0.0, 0.0, -1.0);
+
+  // ----- as std_main_vs.inc, with posn and nrm for vertex and normal
+  vec4 relPosn = modelviewmatrix[0] * vec4(posn, 1.0);
+
+  if (unif[7][0] == 1.0) {                  // this is a point light and unif[8] is location
+    lightVector = vec3(relPosn) - unif[8];
+    lightFactor = pow(length(lightVector), -2.0);
+    lightVector = normalize(lightVector);
+    lightVector.z *= -1.0;
+  } else {                                  // this is directional light
+    lightVector = normalize(unif[8]);
+    lightFactor = 1.0;
+  }
+  lightVector.z *= -1.0;
+  vec3 uvec = normalize(cross(nrm, vec3(0.0003, -1.0, 0.0003)));
+  vec3 vvec = normalize(cross(uvec, nrm));
+  normout = normalize(vec3(modelviewmatrix[0] * vec4(nrm, 0.0)));
+  uvec = vec3(modelviewmatrix[0] * vec4(uvec, 0.0));
+  vvec = vec3(modelviewmatrix[0] * vec4(vvec, 0.0));
+
+  lightVector = vec3(mat4(uvec.x, vvec.x, -normout.x, 0.0,
+                          uvec.y, vvec.y, -normout.y, 0.0,
+                          uvec.z, vvec.z, -normout.z, 0.0,
+                          0.0,    0.0,    0.0,        1.0) * vec4(lightVector, 0.0));
+
+  vec3 inray = vec3(relPosn - vec4(unif[6], 0.0)); // ----- vector from the camera to this vertex
+  dist = length(inray);
+#include std_fog_start.inc
+
+  texcoordout = texcoord * unib[2].xy + unib[3].xy;
+
+  gl_Position = modelviewmatrix[1] * vec4(posn, 1.0);
+  gl_PointSize = unib[2][2] / dist;
+}
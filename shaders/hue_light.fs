@@ -0,0 +1,45 @@
+// uv_light with the texture's HSV hue shifted by unif[16][0] radians, for
+// color-cycling a single texture (animated sclera) instead of swapping
+// in a texture per frame.
+#include std_head_fs.inc
+
+varying vec3 normout;
+varying vec2 texcoordout;
+varying vec3 lightVector;
+varying float lightFactor;
+
+// RGB <-> HSV without branches (Sam Hocevar's formulation).  The art
+// sequence this replaces is an HSV hue shift; turning the color about the
+// grey axis instead comes out visibly different on the saturated art.
+// e keeps grey (d = 0) from dividing by zero and is still a normal
+// number at mediump.
+vec3 rgb2hsv(vec3 c) {
+  vec4 K = vec4(0.0, -1.0 / 3.0, 2.0 / 3.0, -1.0);
+  vec4 p = mix(vec4(c.bg, K.wz), vec4(c.gb, K.xy), step(c.b, c.g));
+  vec4 q = mix(vec4(p.xyw, c.r), vec4(c.r, p.yzx), step(p.x, c.r));
+  float d = q.x - min(q.w, q.y);
+  float e = 1.0e-4;
+  return vec3(abs(q.z + (q.w - q.y) / (6.0 * d + e)), d / (q.x + e), q.x);
+}
+
+vec3 hsv2rgb(vec3 c) {
+  vec4 K = vec4(1.0, 2.0 / 3.0, 1.0 / 3.0, 3.0);
+  vec3 p = abs(fract(c.xxx + K.xyz) * 6.0 - K.www);
+  return c.z * mix(K.xxx, clamp(p - K.xxx, 0.0, 1.0), c.y);
+}
+
+// Shift the hue by angle radians, keeping saturation and value
+vec3 hue_rotate(vec3 c, float angle) {
+  vec3 hsv = rgb2hsv(c);
+  hsv.x += angle * 0.15915494; // 1 / (2 pi): hue in turns
+  return hsv2rgb(hsv);
+}
+
+void main(void) {
+#include std_main_uv.inc
+  texc.rgb = hue_rotate(texc.rgb, unif[16][0]);
+#include std_light.inc
+
+  gl_FragColor = mix(texc, vec4(unif[4], unif[5][1]), ffact); // ------ combine using factors
+  gl_FragColor.a *= unif[5][2];
+}
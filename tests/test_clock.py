@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+
+# clock.py timing logic against a fake clock: steps due, the skip after
+# a stall, interpolation bounds and frame pacing.  Start times are well
+# after 0 since monotonic() counts from boot, not from the epoch.
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import clock
+from clock import fixed_step_t, frame_pacer_t
+
+# monotonic() moves on by tick every call (so a spin loop ends) and
+# sleep() by the time slept
+class fake_clock_t(object):
+    def __init__(self,now_sec=1000.0,tick=1e-5):
+        self.now_sec = now_sec
+        self.tick = tick
+        self.slept = []
+
+    def monotonic(self):
+        now_sec = self.now_sec
+        self.now_sec += self.tick
+        return now_sec
+
+    def sleep(self,sec):
+        self.slept.append(sec)
+        self.now_sec += sec
+
+class fixed_step_test(unittest.TestCase):
+    # dt 0.25: step times are exact in binary
+    def setUp(self):
+        self.sim = fixed_step_t(rate_hz=4.0,max_steps=8)
+        self.t0 = 1000.0
+
+    def test_first_step_is_due_at_once(self):
+        self.assertEqual(self.sim.alpha(self.t0), 1.0)
+        self.assertEqual(self.sim.advance(self.t0), [self.t0])
+        self.assertEqual(self.sim.steps, 1)
+        self.assertEqual(self.sim.alpha(self.t0), 0.0)
+
+    def test_steps_due(self):
+        self.sim.advance(self.t0)
+        self.assertEqual(self.sim.advance(self.t0 + 0.2), [])
+        self.assertEqual(self.sim.advance(self.t0 + 0.6),
+                         [self.t0 + 0.25, self.t0 + 0.5])
+        self.assertEqual(self.sim.steps, 3)
+        self.assertEqual(self.sim.skipped, 0)
+        self.assertAlmostEqual(self.sim.alpha(self.t0 + 0.625), 0.5)
+
+    def test_stall_skips_ahead(self):
+        self.sim.advance(self.t0)
+        times = self.sim.advance(self.t0 + 20 * 0.25)
+        self.assertEqual(len(times), 8)
+        self.assertEqual(self.sim.skipped, 12)
+        self.assertEqual(self.sim.steps, 9)
+        # The steps run are the latest ones, ending at the present
+        self.assertEqual(times[0], self.t0 + 13 * 0.25)
+        self.assertEqual(times[-1], self.t0 + 20 * 0.25)
+        self.assertEqual(self.sim.advance(self.t0 + 20 * 0.25), [])
+
+    def test_alpha_bounds(self):
+        self.sim.advance(self.t0)
+        self.assertEqual(self.sim.alpha(self.t0 - 1.0), 0.0)
+        self.assertEqual(self.sim.alpha(self.t0 + 10.0), 1.0)
+        for i in range(11):
+            a = self.sim.alpha(self.t0 + 0.025 * i)
+            self.assertTrue(0.0 <= a <= 1.0)
+
+class frame_pacer_test(unittest.TestCase):
+    def setUp(self):
+        self.clock = fake_clock_t()
+        self.monotonic = clock.monotonic
+        self.sleep = clock.time.sleep
+        clock.monotonic = self.clock.monotonic
+        clock.time.sleep = self.clock.sleep
+
+    def tearDown(self):
+        clock.monotonic = self.monotonic
+        clock.time.sleep = self.sleep
+
+    def test_no_limit(self):
+        pacer = frame_pacer_t(fps=None)
+        t0 = pacer.wait()
+        self.clock.now_sec += 0.05
+        self.assertTrue(pacer.wait() >= t0 + 0.05)
+        self.assertEqual(self.clock.slept, [])
+        self.assertEqual(pacer.late, 0)
+
+    def test_waits_for_the_next_frame(self):
+        pacer = frame_pacer_t(fps=10.0,spin_sec=0.001)
+        t0 = pacer.wait()
+        self.assertEqual(self.clock.slept, [])
+        self.clock.now_sec += 0.02 # Rendering
+        t1 = pacer.wait()
+        self.assertTrue(t0 + 0.1 <= t1 < t0 + 0.1 + 0.001)
+        # Sleeps all but the spin time
+        self.assertEqual(len(self.clock.slept), 1)
+        self.assertAlmostEqual(self.clock.slept[0], 0.08 - 0.001, places=3)
+        self.assertEqual(pacer.late, 0)
+
+    def test_late_frame_keeps_the_schedule(self):
+        pacer = frame_pacer_t(fps=10.0)
+        t0 = pacer.wait()
+        self.clock.now_sec += 0.15 # Missed the frame at t0 + 0.1
+        pacer.wait()
+        self.assertEqual(pacer.late, 1)
+        self.clock.now_sec += 0.01
+        t2 = pacer.wait()
+        self.assertTrue(t0 + 0.2 <= t2 < t0 + 0.2 + 0.001)
+        self.assertEqual(pacer.late, 1)
+
+    def test_stall_restarts_the_schedule(self):
+        pacer = frame_pacer_t(fps=10.0)
+        t0 = pacer.wait()
+        self.clock.now_sec += 0.5
+        t1 = pacer.wait()
+        self.assertEqual(pacer.late, 1)
+        self.clock.now_sec += 0.01
+        # Next frame one period after the stalled one, not a burst
+        t2 = pacer.wait()
+        self.assertTrue(t1 + 0.1 <= t2 < t1 + 0.1 + 0.001)
+        self.assertEqual(pacer.frames, 3)
+        self.assertTrue(pacer.stats().startswith('3 frames'))
+
+class monotonic_test(unittest.TestCase):
+    def test_never_goes_back(self):
+        last = clock.monotonic()
+        for i in range(1000):
+            now = clock.monotonic()
+            self.assertTrue(now >= last)
+            last = now
+
+if __name__ == '__main__':
+    unittest.main()
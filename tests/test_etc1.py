@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+
+# etc1.py bit layout and round trip: blocks worked out by hand from the
+# ETC1 spec (GL_OES_compressed_ETC1_RGB8_texture) decode to the expected
+# pixels, and encode -> decode keeps art above a PSNR floor.
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from PIL import Image
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+from etc1 import encode, decode, write_pkm, read_pkm, psnr
+
+def block(hi,lo):
+    return np.array([[[hi, lo]]], dtype='>u4')
+
+class etc1_block_test(unittest.TestCase):
+    # Differential, side by side halves: R 16 +1, G 8 -1, B 31 +0 (RGB555
+    # expanded: (132,66,255) and (140,57,255)), tables 0 and 7, pixel
+    # (y, x) modifier index (x + y) % 4
+    def test_differential(self):
+        hi = ((16 << 27) | (1 << 24) | (8 << 19) | (7 << 16) | (31 << 11) |
+              (0 << 8) | (0 << 5) | (7 << 2) | (1 << 1) | 0)
+        lo = 0
+        for y in range(4):
+            for x in range(4):
+                m = (x + y) % 4
+                lo |= ((m & 1) << (x * 4 + y)) | ((m >> 1) << (x * 4 + y + 16))
+        expected = [[(134, 68, 255), (140, 74, 255), ( 93,  10, 208), (  0,   0,  72)],
+                    [(140, 74, 255), (130, 64, 253), (  0,   0,  72), (187, 104, 255)],
+                    [(130, 64, 253), (124, 58, 247), (187, 104, 255), (255, 240, 255)],
+                    [(124, 58, 247), (134, 68, 255), (255, 240, 255), ( 93,  10, 208)]]
+        self.assertEqual(decode(block(hi, lo)).tolist(),
+                         [[list(p) for p in row] for row in expected])
+
+    # Individual RGB444, halves stacked (flip): (170,85,0) on top with
+    # table 2, (51,255,136) below with table 1, every pixel index 1 (+b)
+    def test_individual_flipped(self):
+        hi = ((0xA << 28) | (0x3 << 24) | (0x5 << 20) | (0xF << 16) |
+              (0x0 << 12) | (0x8 << 8) | (2 << 5) | (1 << 2) | (0 << 1) | 1)
+        a = decode(block(hi, 0x0000FFFF))
+        self.assertEqual(a.shape, (4, 4, 3))
+        self.assertTrue((a[0:2] == (199, 114, 29)).all())
+        self.assertTrue((a[2:4] == (68, 255, 153)).all())
+
+class etc1_round_trip_test(unittest.TestCase):
+    def test_art(self):
+        a = np.asarray(Image.open(os.path.join(ROOT, 'graphics', 'iris.jpg')).convert('RGB'))
+        words = encode(a)
+        self.assertEqual(words.shape, (128, 128, 2))
+        # 36.9 dB when this was written
+        self.assertTrue(psnr(a, decode(words)) >= 36.0)
+
+    # Edges padded to whole blocks and cropped again
+    def test_odd_size(self):
+        (y, x) = np.mgrid[0:61, 0:67]
+        a = np.stack((x * 3, y * 4, (x + y) * 2), axis=-1).astype(np.uint8)
+        words = encode(a)
+        self.assertEqual(words.shape, (16, 17, 2))
+        b = decode(words, 61, 67)
+        self.assertEqual(b.shape, a.shape)
+        self.assertTrue(psnr(a, b) >= 38.0)
+
+    def test_flat_color(self):
+        a = np.empty((8, 8, 3), dtype=np.uint8)
+        a[:] = (132, 66, 255)
+        b = decode(encode(a))
+        self.assertTrue(np.abs(a.astype(int) - b).max() <= 2)
+
+    def test_pkm(self):
+        a = np.asarray(Image.open(os.path.join(ROOT, 'graphics', 'iris.jpg'))
+                       .convert('RGB'))[0:30, 0:42]
+        dir = tempfile.mkdtemp()
+        try:
+            fname = os.path.join(dir, 'iris.pkm')
+            write_pkm(fname, a)
+            (words, width, height) = read_pkm(fname)
+            self.assertEqual((width, height), (42, 30))
+            self.assertTrue((words == encode(a)).all())
+            del words
+        finally:
+            shutil.rmtree(dir)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+
+# gfxutil.latheZ() against what it stands in for, pi3d.Lathe followed by
+# reAxis(): the baked sclera geometry has to stay the same to the bit.
+# The reference is pi3d's Shape._lathe() loop (pi3d 2.x) and the array
+# layout pi3d.Buffer gives it; buffer_shape_t is swapped for a stub so
+# nothing needs a display.
+import os
+import sys
+import random
+import unittest
+from math import sin, cos, pi
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import gfxutil
+
+class stub_buffer_t(object):
+    def __init__(self,array_buffer,element_array_buffer):
+        self.array_buffer = array_buffer
+        self.element_array_buffer = element_array_buffer
+
+class stub_shape_t(object):
+    def __init__(self,array_buffer,element_array_buffer):
+        self.buf = [stub_buffer_t(array_buffer, element_array_buffer)]
+
+def vec_normal(vec):
+    n = sum(x ** 2 for x in vec) ** 0.5 or 1
+    return [x / n for x in vec]
+
+# Shape._lathe() with rise 0 and one loop, then Buffer's array_buffer
+def pi3d_lathe(path,sides):
+    s = len(path)
+    rl = sides
+    pn = 0
+    pp = 0
+    tcx = 1.0 / sides
+    pr = (pi / sides) * 2.0
+
+    path_len = 0.0
+    for p in range(1, s):
+        path_len += ((path[p][0] - path[p-1][0])**2 +
+                     (path[p][1] - path[p-1][1])**2)**0.5
+
+    verts = []
+    norms = []
+    idx = []
+    tex_coords = []
+    opx = path[0][0]
+    opy = path[0][1]
+    tcy = 0.0
+    for p in range(s):
+        px, py = path[p][0], path[p][1]
+        if p > 0:
+            tcy += ((px - opx) ** 2 + (py - opy) ** 2) ** 0.5 / path_len
+        dx, dy = vec_normal((px - opx, py - opy))
+        for r in range(0, rl + 1):
+            sinr = sin(pr * r)
+            cosr = cos(pr * r)
+            verts.append((px * sinr, py, px * cosr))
+            norms.append((-sinr * dy, dx, -cosr * dy))
+            tex_coords.append((1.0 - tcx * r, tcy))
+        if p < s - 1:
+            pn += (rl + 1)
+            for r in range(rl):
+                idx.append((pp + r + 1, pp + r, pn + r))
+                idx.append((pn + r, pn + r + 1, pp + r + 1))
+            pp += (rl + 1)
+        opx = px
+        opy = py
+
+    array_buffer = np.zeros((len(verts), 8), dtype='float32')
+    array_buffer[:,0:3] = np.array(verts, dtype='float32')
+    array_buffer[:,3:6] = np.array(norms, dtype='float32')
+    array_buffer[:,6:8] = np.array(tex_coords, dtype='float32')
+    return stub_shape_t(array_buffer, np.array(idx, dtype='short'))
+
+# Sclera-like outline: from the back of the eye round to the front
+def random_path(rng):
+    n = rng.randint(4, 40)
+    r = rng.uniform(10.0, 300.0)
+    a0 = rng.uniform(0.0, 0.5 * pi)
+    a1 = rng.uniform(a0 + 0.1, pi)
+    path = []
+    for i in range(n):
+        a = a0 + (a1 - a0) * i / float(n - 1)
+        path.append((r * sin(a) * rng.uniform(0.98, 1.02), r * cos(a)))
+    return path
+
+class lathe_z_test(unittest.TestCase):
+    def setUp(self):
+        self.buffer_shape_t = gfxutil.buffer_shape_t
+        gfxutil.buffer_shape_t = stub_shape_t
+
+    def tearDown(self):
+        gfxutil.buffer_shape_t = self.buffer_shape_t
+
+    def check(self,path,sides,texOffset):
+        ref = pi3d_lathe(path, sides)
+        gfxutil.reAxis(ref, texOffset)
+        got = gfxutil.latheZ(path, sides, texOffset)
+        ab = ref.buf[0].array_buffer
+        self.assertEqual(got.buf[0].array_buffer.dtype, ab.dtype)
+        self.assertEqual(got.buf[0].array_buffer.shape, ab.shape)
+        # Exact, not close: the bytes are what the geometry cache keeps
+        self.assertEqual(got.buf[0].array_buffer.tobytes(), ab.tobytes())
+        self.assertTrue(np.array_equal(got.buf[0].element_array_buffer,
+                                       ref.buf[0].element_array_buffer))
+
+    def test_random_paths(self):
+        rng = random.Random(9)
+        for i in range(5):
+            self.check(random_path(rng), rng.choice([16, 64, 256]),
+                       rng.choice([0.0, 0.5]))
+
+    # Repeated point: zero length direction, normal left as is
+    def test_repeated_point(self):
+        self.check([(0.0, 100.0), (50.0, 80.0), (50.0, 80.0), (100.0, 0.0)], 24, 0.5)
+
+if __name__ == '__main__':
+    unittest.main()
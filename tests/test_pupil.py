@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+
+# pupil_trajectory_t against the recursive split() it replaced in
+# gecko.py: with the same seed it has to make the same midpoints, in the
+# same random draw order, and the same leaf timing.
+import os
+import sys
+import random
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pupil import pupil_trajectory_t
+
+# The old split() with the drawing loop replaced by recording each leaf
+# as (startValue, endValue, duration)
+def split(leaves,startValue,endValue,duration,range):
+    if range >= 0.125:
+        duration *= 0.5
+        range    *= 0.5
+        midValue  = ((startValue + endValue - range) * 0.5 +
+                     random.uniform(0.0, range))
+        split(leaves, startValue, midValue, duration, range)
+        split(leaves, midValue  , endValue, duration, range)
+    else:
+        leaves.append((startValue, endValue, duration))
+    return leaves
+
+class pupil_trajectory_test(unittest.TestCase):
+    def curves(self,seed,startValue,endValue,duration,range):
+        random.seed(seed)
+        leaves = split([], startValue, endValue, duration, range)
+        random.seed(seed)
+        pupil = pupil_trajectory_t()
+        pupil.start(10.0, startValue, endValue, duration, range)
+        return (leaves, pupil)
+
+    def check(self,leaves,pupil,startValue):
+        self.assertEqual(pupil.keys, [startValue] + [leaf[1] for leaf in leaves])
+        for (i, leaf) in enumerate(leaves):
+            self.assertEqual(leaf[0], pupil.keys[i])
+            self.assertAlmostEqual(leaf[2], pupil.leaf_duration)
+
+    def test_same_curve(self):
+        for seed in range(20):
+            (leaves, pupil) = self.curves(seed, 0.5, 0.8, 4.0, 1.0)
+            self.assertEqual(len(leaves), 16)
+            self.check(leaves, pupil, 0.5)
+
+    def test_same_random_state_after(self):
+        self.curves(3, 0.2, 0.9, 4.0, 1.0)
+        after_new = random.random()
+        random.seed(3)
+        split([], 0.2, 0.9, 4.0, 1.0)
+        self.assertEqual(random.random(), after_new)
+
+    def test_no_split(self):
+        (leaves, pupil) = self.curves(5, 0.3, 0.6, 2.0, 0.1)
+        self.assertEqual(leaves, [(0.3, 0.6, 2.0)])
+        self.check(leaves, pupil, 0.3)
+        # No random draws at all
+        state = random.getstate()
+        random.seed(5)
+        self.assertEqual(random.getstate(), state)
+
+    # Within a leaf the old loop drew startValue + dv * dt / duration
+    def test_value(self):
+        (leaves, pupil) = self.curves(7, 0.5, 0.8, 4.0, 1.0)
+        self.assertEqual(pupil.value(10.0), 0.5)
+        self.assertEqual(pupil.value(9.0), 0.5)
+        for (i, (v0, v1, duration)) in enumerate(leaves):
+            for f in (0.0, 0.25, 0.5, 0.75):
+                self.assertAlmostEqual(pupil.value(10.0 + (i + f) * duration),
+                                       v0 + (v1 - v0) * f)
+        self.assertFalse(pupil.done(13.9))
+        self.assertTrue(pupil.done(14.0))
+        self.assertEqual(pupil.value(14.0), 0.8)
+        self.assertEqual(pupil.end(), 0.8)
+
+    def test_scale_clamped(self):
+        pupil = pupil_trajectory_t(pupil_min=0.2, pupil_max=0.7)
+        pupil.start(0.0, 0.0, 1.0, 1.0, 0.1)
+        self.assertEqual(pupil.scale(0.1), 0.2)
+        self.assertAlmostEqual(pupil.scale(0.5), 0.5)
+        self.assertEqual(pupil.scale(0.9), 0.7)
+        # The curve itself is not clamped
+        self.assertAlmostEqual(pupil.value(0.9), 0.9)
+
+if __name__ == '__main__':
+    unittest.main()
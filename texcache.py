@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+
+import ctypes
+import collections
+import pi3d
+from pi3d.constants import opengles, GL_TEXTURE_2D, GL_EXTENSIONS, GL_UNSIGNED_BYTE, \
+    GL_TEXTURE_MIN_FILTER, GL_TEXTURE_MAG_FILTER, GL_TEXTURE_WRAP_S, GL_TEXTURE_WRAP_T
+from rawcache import decode_image
+from etc1 import read_pkm, decode as etc1_decode
+
+GL_ETC1_RGB8_OES = 0x8D64
+
+# Registry of loaded textures keyed by (path, filter, mipmap), so an
+# image used by several eye contexts (or as both a hack sclera and a
+# hack iris) is decoded and uploaded once.  blend is not part of the key:
+# it is only a draw time flag, so a texture wanted with the other blend
+# setting is handed out as a texture_blend_t on the same GL texture.
+# Textures stay resident until the registry holds more than max_bytes of
+# texture memory; then the least recently used are dropped (pi3d frees
+# the GL texture once no shape refers to it any more).
+def texture_bytes(texture):
+    if getattr(texture, 'blocks', None) is not None and texture.image is None:
+        return texture.blocks.nbytes
+    image = getattr(texture, 'image', None)
+    if image is not None and hasattr(image, 'shape'):
+        channels = image.shape[2] if len(image.shape) > 2 else 1
+    else:
+        channels = 4
+    nbytes = texture.ix * texture.iy * channels
+    if getattr(texture, 'mipmap', False):
+        nbytes = nbytes * 4 // 3
+    return nbytes
+
+gl_extensions = None
+
+def etc1_supported():
+    global gl_extensions
+    if gl_extensions is None:
+        p = opengles.glGetString(GL_EXTENSIONS)
+        gl_extensions = ctypes.string_at(p).decode('ascii').split() if p else []
+    return 'GL_OES_compressed_ETC1_RGB8_texture' in gl_extensions
+
+# pi3d.Texture for an ETC1 .pkm file (see etc1.py): the blocks go to the
+# GPU as they are, at 4 bits a pixel.  Where the GL has no ETC1 (desktop
+# development) they are decoded to RGB in software instead.  No mipmaps.
+class etc1_texture_t(pi3d.Texture):
+    def __init__(self,fname,blend=False,filter=pi3d.GL_LINEAR,defer=False):
+        self.blocks = None
+        super(etc1_texture_t,self).__init__(fname,
+                                            blend=blend,
+                                            mipmap=False,
+                                            filter=filter,
+                                            defer=defer)
+
+    def _load_disk(self):
+        if self._loaded:
+            return
+        (self.blocks, width, height) = read_pkm(self.file_string)
+        # Padded to whole blocks
+        self.iy = self.blocks.shape[0] * 4
+        self.ix = self.blocks.shape[1] * 4
+        self.image = None
+        self._tex = ctypes.c_uint()
+        self._loaded = True
+
+    def update_ndarray(self,new_array=None,texture_num=None):
+        if new_array is not None or not etc1_supported():
+            if new_array is None and self.image is None:
+                self.image = etc1_decode(self.blocks)
+            return super(etc1_texture_t,self).update_ndarray(new_array,texture_num)
+
+        if texture_num is not None:
+            opengles.glActiveTexture(pi3d.GL_TEXTURE0 + texture_num)
+        opengles.glBindTexture(GL_TEXTURE_2D, self._tex)
+        for t in [GL_TEXTURE_MIN_FILTER, GL_TEXTURE_MAG_FILTER]:
+            opengles.glTexParameteri(GL_TEXTURE_2D, t, self._get_filter(t))
+        opengles.glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, self.m_repeat)
+        opengles.glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, self.m_repeat)
+        opengles.glCompressedTexImage2D(GL_TEXTURE_2D, 0, GL_ETC1_RGB8_OES,
+                                        self.ix, self.iy, 0, self.blocks.nbytes,
+                                        self.blocks.ctypes.data_as(ctypes.c_void_p))
+
+# The same GL texture with its own blend flag; everything else is the
+# texture's (and it stays alive as long as the view does)
+class texture_blend_t(object):
+    def __init__(self,texture,blend):
+        self.texture = texture
+        self.blend = blend
+
+    def __getattr__(self,name):
+        return getattr(self.texture,name)
+
+class texture_cache_t(object):
+    def __init__(self,max_bytes=None,debug=False):
+        self.debug = debug
+        self.max_bytes = max_bytes # None: no budget
+        self.raw = None # raw_cache_t for decoded pixels, None: pi3d reads files
+        self.assets = None # asset_manifest_t of per-display variants
+        self.textures = collections.OrderedDict() # Least recently used first
+        self.views = {} # (key, blend) -> texture_blend_t
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self,fname,filter,mipmap):
+        return (fname, filter, mipmap)
+
+    def cached(self,fname,filter=pi3d.GL_LINEAR,blend=False,mipmap=False):
+        return self.key(fname,filter,mipmap) in self.textures
+
+    # texture as wanted with blend, the same object if it already is
+    def blended(self,key,texture,blend):
+        if texture.blend == blend:
+            return texture
+        view = self.views.get((key, blend))
+        if view is None:
+            view = texture_blend_t(texture,blend)
+            self.views[(key, blend)] = view
+        return view
+
+    # Pixels for fname from the display variant or the raw cache, None if
+    # neither is set up (pi3d then reads the file itself)
+    def pixels(self,fname):
+        a = None
+        if self.assets is not None:
+            a = self.assets.load(fname)
+        if a is None and self.raw is not None:
+            a = self.raw.load(fname)
+        return a
+
+    # ETC1 file for fname: fname itself if it is one, else the display
+    # variant if one was built; None otherwise
+    def compressed(self,fname,mipmap=False):
+        if fname.lower().endswith('.pkm'):
+            return fname
+        if self.assets is not None and not mipmap:
+            return self.assets.compressed(fname)
+        return None
+
+    # Same, decoding the file if need be (for the hack eye prefetch);
+    # None for ETC1 files, which go to the GPU without decoding
+    def load_pixels(self,fname):
+        if self.compressed(fname) is not None:
+            return None
+        a = self.pixels(fname)
+        if a is None:
+            a = decode_image(fname)
+        return a
+
+    # pixels: fname already decoded (numpy array), used on a miss instead
+    # of reading the file
+    def get(self,fname,filter=pi3d.GL_LINEAR,blend=False,mipmap=False,
+            pixels=None,defer=False):
+        key = self.key(fname,filter,mipmap)
+        entry = self.textures.pop(key, None)
+        if entry is not None:
+            self.hits += 1
+            self.textures[key] = entry
+            return self.blended(key,entry[0],blend)
+
+        self.misses += 1
+        fname_etc1 = self.compressed(fname,mipmap) if pixels is None else None
+        if fname_etc1 is not None:
+            texture = etc1_texture_t(fname_etc1,
+                                     blend=blend,
+                                     filter=filter,
+                                     defer=defer)
+        else:
+            if pixels is None:
+                pixels = self.pixels(fname)
+            texture = pi3d.Texture(fname if pixels is None else pixels,
+                                   mipmap=mipmap,
+                                   defer=defer,
+                                   filter=filter,
+                                   blend=blend)
+        nbytes = texture_bytes(texture)
+        self.textures[key] = (texture, nbytes)
+        self.nbytes += nbytes
+        if self.debug:
+            print ('texture cache: loaded {} ({} bytes)'.format(fname,nbytes))
+        self.evict()
+        return texture
+
+    def evict(self):
+        # The newest texture stays even if it alone is over budget
+        while self.max_bytes is not None and self.nbytes > self.max_bytes \
+              and len(self.textures) > 1:
+            (key, (texture, nbytes)) = self.textures.popitem(last=False)
+            self.views.pop((key, not texture.blend), None)
+            self.nbytes -= nbytes
+            self.evictions += 1
+            if self.debug:
+                print ('texture cache: evicted {}'.format(key[0]))
+
+    def stats(self):
+        return '{} textures, {:.1f} MB, {} hits, {} misses, {} evictions'.format(
+            len(self.textures), self.nbytes / float(1 << 20),
+            self.hits, self.misses, self.evictions)
+
+# A fixed set of GL textures for art that is swapped often (the hack
+# eye's iris and sclera): new art is uploaded into the least recently
+# used slot with glTexSubImage2D, or reallocated under the same GL name
+# if its size or format differs, so swapping never creates or frees GL
+# objects.  With two slots one is on screen while the next art loads
+# into the other.  Takes decoded pixels (not ETC1 files).
+class texture_pool_t(object):
+    def __init__(self,slots=2,filter=pi3d.GL_LINEAR,blend=False,mipmap=False,
+                 debug=False):
+        self.debug = debug
+        self.slots = slots
+        self.filter = filter
+        self.blend = blend
+        self.mipmap = mipmap
+        self.textures = [] # Least recently acquired first
+        self.fnames = {} # texture -> art it holds
+        self.uploads = 0
+        self.reallocs = 0
+
+    def acquire(self,fname,pixels):
+        for texture in self.textures:
+            if self.fnames[texture] == fname:
+                # Already holds this art
+                self.textures.remove(texture)
+                self.textures.append(texture)
+                return texture
+
+        if len(self.textures) < self.slots:
+            texture = pi3d.Texture(pixels,
+                                   mipmap=self.mipmap,
+                                   filter=self.filter,
+                                   blend=self.blend)
+        else:
+            texture = self.textures.pop(0)
+            self.upload(texture,pixels)
+        self.textures.append(texture)
+        self.fnames[texture] = fname
+        if self.debug:
+            print ('texture pool: {} in slot {}'.format(fname,texture._tex.value))
+        return texture
+
+    def upload(self,texture,pixels):
+        self.uploads += 1
+        if pixels.shape != texture.image.shape:
+            self.reallocs += 1
+            (texture.iy, texture.ix) = pixels.shape[0:2]
+            texture.update_ndarray(pixels)
+            return
+        texture.image = pixels
+        opengles.glBindTexture(GL_TEXTURE_2D, texture._tex)
+        opengles.glTexSubImage2D(GL_TEXTURE_2D, 0, 0, 0, texture.ix, texture.iy,
+                                 texture._get_format_from_array(pixels, texture.i_format),
+                                 GL_UNSIGNED_BYTE,
+                                 pixels.ctypes.data_as(ctypes.c_void_p))
+        if self.mipmap:
+            opengles.glGenerateMipmap(GL_TEXTURE_2D)
+
+    def stats(self):
+        return '{} slots, {} uploads, {} reallocations'.format(
+            len(self.textures), self.uploads, self.reallocs)